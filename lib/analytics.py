@@ -5,6 +5,8 @@ Controlled by flags to avoid too much overhead when not needed.
 MIT License Jorge Nadal. 2022
 """
 import math
+from array import array
+from collections import deque
 
 try:
     from typing import Sequence
@@ -24,30 +26,72 @@ class DataStats:
     "range": max - min,
     "overhead": (mean - smin) / smin
 
-    It accepts integers/floats or lists/tuples of int/float."""
+    It accepts integers/floats or lists/tuples of int/float.
+    Mean and stdev are maintained with Welford's online update, which keeps
+    rounding error low even over thousands of small samples."""
 
-    def __init__(self, max_samples: int = 1000, print_result: bool = True):
+    __slots__ = ("max_samples", "_buf", "_print_result", "_remaining", "_n", "_mean", "_m2", "_min", "_max", "_stats_cache", "_stats_cache_n")  # fmt: skip
+
+    def __init__(self, max_samples: int = 1000, print_result: bool = True, keep_samples: bool = True):
         self.max_samples = max_samples
-        self._samples = []
+        # Preallocated flat buffer instead of a list of boxed floats:
+        # 8 B per sample, contiguous, no reallocation or heap churn while sampling.
+        # With keep_samples=False only the running stats are kept and no
+        # buffer is allocated at all, the cheapest mode for high-rate sampling.
+        self._buf = array("d", (0 for _ in range(max_samples))) if keep_samples else None
         self._print_result = print_result
+        # Countdown of free slots: the hot-path capacity check is a single
+        # attribute truthiness test instead of a compare against max_samples.
+        self._remaining = max_samples
+        # Running stats, updated on every add so calc_stats is O(1).
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = None
+        self._max = None
+        # Memoized calc_stats result and the sample count it was built from.
+        self._stats_cache = None
+        self._stats_cache_n = -1
 
     def add_sample(self, sample: int | float) -> None:
         """Add sample to the collection."""
-        if len(self._samples) < self.max_samples:
-            self._samples.append(sample)
+        if self._remaining:
+            self._remaining -= 1
+            if self._buf is not None:
+                self._buf[self._n] = sample
+            # Welford's online update
+            n = self._n + 1
+            self._n = n
+            delta = sample - self._mean
+            self._mean += delta / n
+            self._m2 += delta * (sample - self._mean)
+            if self._min is None or sample < self._min:
+                self._min = sample
+            if self._max is None or sample > self._max:
+                self._max = sample
         else:
             print("\nDataStats: Max samples reached, rejecting additional data")
 
     def extend_samples(self, samples: Sequence[int | float]) -> None:
-        """Add a sequence of samples"""
-        if len(self._samples) + len(samples) < self.max_samples:
-            self._samples.extend(samples)
-        else:
+        """Add a sequence of samples. If only part of the batch fits,
+        that part is kept and just the overflow is rejected."""
+        room = self._remaining
+        for sample in samples[:room]:
+            self.add_sample(sample)
+        if len(samples) > room:
             print("\nDataStats: Max samples reached, rejecting additional data")
 
     def clear(self):
         """Clears all collected samples."""
-        self._samples = []
+        # Buffer is reused as-is, resetting the write index is enough.
+        self._remaining = self.max_samples
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = None
+        self._max = None
+        # Invalidate explicitly: a refilled buffer can reach the same count.
+        self._stats_cache_n = -1
 
     def calc_stats(self) -> dict:
         """Return stats from collected data.
@@ -55,37 +99,31 @@ class DataStats:
         Returns:
             dict: Stats of collected samples
         """
-        stats = {}
-        num_samples = len(self._samples)
-
-        # Mean
-        sums = 0
-        for i in range(num_samples):
-            sums += self._samples[i]
-        mean = sums / num_samples
-
-        # Difference squared
-        difference_squared = 0
-        for i in range(num_samples):
-            difference_squared += (self._samples[i] - mean) ** 2
-
-        stdev = math.sqrt(difference_squared / (num_samples - 1)) if num_samples > 1 else 0
-        smax = max(self._samples)
-        smin = min(self._samples)
-
-        stats = {
-            "samples": num_samples,
-            "min": smin,
-            "max": smax,
-            "avg": mean,
-            "stdev": stdev,
-            "range": smax - smin,
-            "overhead": (mean - smin) / smin,
-        }
+        num_samples = self._n
+
+        if self._stats_cache_n == num_samples:
+            stats = self._stats_cache
+        else:
+            mean = self._mean
+            stdev = math.sqrt(self._m2 / (num_samples - 1)) if num_samples > 1 else 0
+            smin = self._min
+            smax = self._max
+
+            stats = {
+                "samples": num_samples,
+                "min": smin,
+                "max": smax,
+                "avg": mean,
+                "stdev": stdev,
+                "range": smax - smin,
+                "overhead": (mean - smin) / smin,
+            }
+            self._stats_cache = stats
+            self._stats_cache_n = num_samples
 
         if self._print_result:
-            for key, value in stats.items():
-                print(f"{key:>10}: {value:>8.2f}")
+            # One write for the whole block: each print is a serial flush on target.
+            print("\n".join(f"{key:>10}: {value:>8.2f}" for key, value in stats.items()))
         return stats
 
 
@@ -95,17 +133,74 @@ class Log:
     a small stack trace.
     """
 
+    __slots__ = ("_max_size", "_log")
+
     def __init__(self, max_size: int = 50):
-        self.max_size = max_size
-        self._log = []
+        # Bounded deque drops the oldest entry in O(1); list.pop(0) was O(N).
+        self._max_size = max_size
+        self._log = deque((), max_size)
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, max_size: int) -> None:
+        # The bound is fixed at construction, so resizing rebuilds the deque.
+        self._max_size = max_size
+        old = self._log
+        self._log = deque((), max_size)
+        for message in old:
+            self._log.append(message)
 
     def log(self, message: str) -> None:
         """Add a message to the log."""
-        if len(self._log) < self.max_size:
-            self._log.append(message)
-        else:
-            self._log.append(message)
-            self._log.pop(0)
+        self._log.append(message)
+
+
+class _RunningAvg:
+    """Mutable sum/count pair for the "avg" collect mode. Updated in place,
+    so no tuple is allocated per event."""
+
+    __slots__ = ("s", "n")
+
+    def __init__(self, value):
+        self.s = value
+        self.n = 1
+
+
+def _update_avg(s, k, slot, v):
+    slot.s += v
+    slot.n += 1
+
+
+# Sentinel distinguishing "key absent" from any stored value.
+_MISSING = object()
+
+# Per-mode update handlers for Analytics.collect on already-known keys.
+# A single dict lookup replaces the old if/elif scan over mode strings.
+# Handlers receive the already-fetched slot, so immutable values cost one
+# store and mutable ones are updated in place with no extra probe.
+_COLLECT = {
+    "count": lambda s, k, slot, v: s.__setitem__(k, slot + 1),
+    "sum": lambda s, k, slot, v: s.__setitem__(k, slot + v),
+    "max": lambda s, k, slot, v: s.__setitem__(k, v if slot < v else slot),
+    "min": lambda s, k, slot, v: s.__setitem__(k, v if slot > v else slot),
+    "avg": _update_avg,
+    "dict": lambda s, k, slot, v: slot.update(v),
+    "clear": lambda s, k, slot, v: s.__setitem__(k, v),
+    "full": lambda s, k, slot, v: slot.add_sample(v),
+}
+
+
+# print_stats formatters keyed on the stored value's exact type. Types not
+# listed print as-is; None marks values deferred to the full-stats section.
+_FMT = {
+    DataStats: None,
+    _RunningAvg: lambda v: v.s / v.n,
+    dict: str,
+    list: str,
+}
 
 
 class Analytics:
@@ -126,74 +221,76 @@ class Analytics:
     def __init__(self, **flags):
         self.stats = {}
         self.flags = flags
-        self.fslog = Log()
+        # Promote the hot flags to plain booleans once, so the disabled path
+        # of collect/print/log is a single attribute test, not a dict lookup.
+        self._on_analytics = bool(flags.get("analytics", False))
+        self._on_print = bool(flags.get("debug_print", False) or flags.get("print", False))
+        # Widest key seen so far, maintained as keys are added so print_stats
+        # does not have to rescan all keys to compute its column width.
+        self._max_key_len = 0
+        # Allocated lazily: an Analytics with logging off never pays for it.
+        self._fslog = None
+
+    @property
+    def fslog(self) -> Log:
+        if self._fslog is None:
+            self._fslog = Log()
+        return self._fslog
 
     def collect(self, key, value=None, mode="count"):
-        if not self.flags.get("analytics", False):
+        if not self._on_analytics:
             return
-        if key in self.stats:
-            if mode == "count":
-                self.stats[key] += 1
-            elif value is not None:
-                if mode == "sum":
-                    self.stats[key] += value
-                elif mode == "max":
-                    self.stats[key] = max(self.stats[key], value)
-                elif mode == "min":
-                    self.stats[key] = min(self.stats[key], value)
-                elif mode == "avg":
-                    prev = self.stats[key]
-                    self.stats[key] = (prev[0] + value, prev[1] + 1)
-                elif mode == "dict":
-                    self.stats[key].update(value)
-                elif mode == "clear":
-                    self.stats[key] = value
-                elif mode == "full":
-                    self.stats[key].add_sample(value)
+        stats = self.stats
+        slot = stats.get(key, _MISSING)
+        if slot is not _MISSING:
+            if mode == "count" or value is not None:
+                _COLLECT[mode](stats, key, slot, value)
         else:
             if mode == "full":
-                self.stats[key] = DataStats()
+                # Stats only: the raw samples are never read back by
+                # print_stats, so don't pay for the sample buffer.
+                stats[key] = DataStats(keep_samples=False)
             elif mode == "avg":
-                self.stats[key] = (value, 1)
+                stats[key] = _RunningAvg(value)
             elif mode == "count":
-                self.stats[key] = 1
+                stats[key] = 1
             else:
-                self.stats[key] = value
+                stats[key] = value
+            key_len = len(str(key))
+            if key_len > self._max_key_len:
+                self._max_key_len = key_len
 
     def print(self, *args, **kwargs):
-        if any(self.flags.get(flag, False) for flag in ["debug_print", "print"]):
+        if self._on_print:
             print(*args, **kwargs)
 
     def log(self, message: str):
-        if self.flags.get("analytics", False):
+        if self._on_analytics:
             self.fslog.log(message)
 
     def print_log(self):
-        print("-------- Log --------")
-        for message in self.fslog._log:
-            print(message)
-        print("---------------------")
+        lines = ["-------- Log --------"]
+        if self._fslog is not None:
+            lines.extend(self._fslog._log)
+        lines.append("---------------------")
+        print("\n".join(lines))
 
     def print_stats(self):
         full_list = []
-        try:
-            fclen = max([len(str(key)) for key in self.stats]) + 5
-        except ValueError:
-            fclen = 30
-        print("------ Usage Stats ------")
-        print(f"{'Key':<{fclen}} {'Value':>10}")
+        fclen = self._max_key_len + 5 if self.stats else 30
+        lines = ["------ Usage Stats ------", f"{'Key':<{fclen}} {'Value':>10}"]
         for key, value in sorted(self.stats.items()):
-            if isinstance(value, DataStats):
+            fmt = _FMT.get(type(value), False)
+            if fmt is None:
                 # Print at the end
                 full_list.append((key, value))
                 continue
-            elif isinstance(value, tuple):
-                # Calculate average
-                value = value[0] / value[1]
-            elif isinstance(value, dict) or isinstance(value, list):
-                value = str(value)
-            print(f"{key:<{fclen}} {value:>10}")
-        print()
+            elif fmt:
+                value = fmt(value)
+            lines.append(f"{key:<{fclen}} {value:>10}")
+        lines.append("")
+        # One write for the whole table: each print is a serial flush on target.
+        print("\n".join(lines))
         for key, value in full_list:
             print(f" -> Full stats for {key}:")
             value.calc_stats()
@@ -206,7 +303,8 @@ class Analytics:
 
     def clear(self):
         self.stats = {}
-        self.fslog = Log()
+        self._max_key_len = 0
+        self._fslog = None
 
 
 if __name__ == "__main__":
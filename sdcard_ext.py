@@ -31,11 +31,14 @@ that improves performance for LFS2.
 Original driver: https://github.com/micropython/micropython-lib/blob/master/micropython/drivers/storage/sdcard/sdcard.py
 """
 
+import micropython
 from micropython import const
 import time
 
 
 _CMD_TIMEOUT = const(100)
+# polls without delay before the token wait falls back to 1 ms sleeps
+_FAST_SPIN = const(200)
 
 _R1_IDLE_STATE = const(1 << 0)
 # R1_ERASE_RESET = const(1 << 1)
@@ -48,6 +51,25 @@ _TOKEN_CMD25 = const(0xFC)
 _TOKEN_STOP_TRAN = const(0xFD)
 _TOKEN_DATA = const(0xFE)
 
+# Preallocated fill bytes: reusing one immutable object avoids re-creating a
+# bytes literal at every SPI call site on ports that do not intern them.
+_FF1 = b"\xff"
+_FF2 = b"\xff\xff"
+# data token as a bytes needle for bytearray.find in the batched token scan
+_TOKEN_DATA_B = b"\xfe"
+
+# Prebuilt packets for the commands whose argument and CRC never change, so
+# sending them skips the six bytearray stores cmd() does per call.
+_CMD0_PKT = b"\x40\x00\x00\x00\x00\x95"
+_CMD8_PKT = b"\x48\x00\x00\x01\xaa\x87"
+_CMD12_PKT = b"\x4c\x00\x00\x00\x00\xff"
+_CMD16_PKT = b"\x50\x00\x00\x02\x00\x00"
+
+
+def _noop(*args, **kwargs):
+    # stand-in for Stats.collect when debug is off
+    pass
+
 
 class SDCard:
     def __init__(self, spi, cs, baudrate=1320000, debug=False):
@@ -55,20 +77,49 @@ class SDCard:
         self.cs = cs
 
         self.cmdbuf = bytearray(6)
-        self.dummybuf = bytearray(512)
+        self.dummybuf = bytearray(_FF1 * 512)
         self.tokenbuf = bytearray(1)
+        self.respbuf = bytearray(8)
+        # busy-wait polling in 16-byte batches instead of byte-at-a-time
+        self.pollbuf = bytearray(16)
+        self.pollsrc = bytes(_FF1 * 16)
         self.cache = bytearray(512)
         self.mv_cache = memoryview(self.cache)
+        # stream read buffers: one 515-byte transfer covers token + data + CRC
+        # of a block in a CMD18 stream
+        self._streamsrc = bytes(_FF1 * 515)
+        self._streambuf = bytearray(515)
+        self._mv_streambuf = memoryview(self._streambuf)
+        # combined start-token + data + CRC buffer so a sector program is one
+        # SPI write instead of three (token, data, checksum)
+        self._writebuf = bytearray(515)
+        self._writebuf[513] = 0xFF
+        self._writebuf[514] = 0xFF
+        # second block buffer for writes with both ends misaligned
+        self.cache2 = bytearray(512)
+        self.mv_cache2 = memoryview(self.cache2)
         self.cache_block = -1
         self.cache_dirty = False
 
-        for i in range(512):
-            self.dummybuf[i] = 0xFF
         self.dummybuf_memoryview = memoryview(self.dummybuf)
 
         self.debug = debug
         if debug:
             self.stats = self.Stats()
+        # bound once at init: the disabled path costs a no-op call instead of
+        # a flag test plus attribute chain at every collect site
+        self._collect = self.stats.collect if debug else _noop
+
+        # ioctl dispatch table indexed by op, replacing the if/elif chain
+        self._ioctl_table = (
+            None,  # 0
+            None,  # 1
+            None,  # 2
+            self._op_sync,  # 3
+            self._op_num_blocks,  # 4
+            self._op_block_size,  # 5
+            self._op_erase_block,  # 6
+        )
 
         # initialise the card
         self.init_card(baudrate)
@@ -91,18 +142,17 @@ class SDCard:
         self.init_spi(100000)
 
         # clock card at least 100 cycles with cs high
-        for i in range(16):
-            self.spi.write(b"\xff")
+        self.spi.write(self.dummybuf_memoryview[:16])
 
         # CMD0: init card; should return _R1_IDLE_STATE (allow 5 attempts)
         for _ in range(5):
-            if self.cmd(0, 0, 0x95) == _R1_IDLE_STATE:
+            if self._cmd_packet(_CMD0_PKT) == _R1_IDLE_STATE:
                 break
         else:
             raise OSError("no SD card")
 
         # CMD8: determine card version
-        r = self.cmd(8, 0x01AA, 0x87, 4)
+        r = self._cmd_packet(_CMD8_PKT, 4)
         if r == _R1_IDLE_STATE:
             self.init_card_v2()
         elif r == (_R1_IDLE_STATE | _R1_ILLEGAL_COMMAND):
@@ -129,7 +179,7 @@ class SDCard:
         print("init_car: sectors", self.sectors)
 
         # CMD16: set block length to 512 bytes
-        if self.cmd(16, 512, 0) != 0:
+        if self._cmd_packet(_CMD16_PKT) != 0:
             raise OSError("can't set 512 block size")
 
         # set to high data rate now that it's initialised
@@ -166,10 +216,9 @@ class SDCard:
                 return
         raise OSError("timeout waiting for v2 card")
 
+    @micropython.native
     def cmd(self, cmd, arg, crc, final=0, release=True, skip1=False):
-        self.cs(0)
-
-        # create and send the command
+        # create the command packet
         buf = self.cmdbuf
         buf[0] = 0x40 | cmd
         buf[1] = arg >> 24
@@ -177,91 +226,178 @@ class SDCard:
         buf[3] = arg >> 8
         buf[4] = arg
         buf[5] = crc
-        self.spi.write(buf)
+        return self._cmd_packet(buf, final, release, skip1)
 
-        if skip1:
-            self.spi.readinto(self.tokenbuf, 0xFF)
+    @micropython.native
+    def _cmd_packet(self, packet, final=0, release=True, skip1=False):
+        """Send a prebuilt 6-byte command packet and poll for the response."""
+        self.cs(0)
+        self.spi.write(packet)
 
-        # wait for the response (response[7] == 0)
-        for i in range(_CMD_TIMEOUT):
-            self.spi.readinto(self.tokenbuf, 0xFF)
-            response = self.tokenbuf[0]
-            if not (response & 0x80):
-                # this could be a big-endian integer that we are getting here
-                # if final<0 then store the first byte to tokenbuf and discard the rest
-                if final < 0:
-                    self.spi.readinto(self.tokenbuf, 0xFF)
-                    final = -1 - final
-                for j in range(final):
-                    self.spi.write(b"\xff")
-                if release:
-                    self.cs(1)
-                    self.spi.write(b"\xff")
-                return response
+        spi_readinto = self.spi.readinto
+        tokenbuf = self.tokenbuf
+
+        if skip1:
+            spi_readinto(tokenbuf, 0xFF)
+
+        response = -1
+        avail = 0  # response trailer bytes already clocked in by the burst
+        if release:
+            # The card releases the bus after this command, so overclocking is
+            # safe: fetch 8 bytes in one transfer and scan for the response
+            # instead of one Python-level SPI call per polled byte.
+            # (With release=False a data token may follow the response, so
+            # those commands keep the byte-by-byte poll below.)
+            resp = self.respbuf
+            self.spi.write_readinto(self.dummybuf_memoryview[:8], resp)
+            for i in range(8):
+                if not (resp[i] & 0x80):
+                    response = resp[i]
+                    avail = 7 - i
+                    break
+        if response < 0:
+            # wait for the response (response[7] == 0)
+            for i in range(_CMD_TIMEOUT):
+                spi_readinto(tokenbuf, 0xFF)
+                if not (tokenbuf[0] & 0x80):
+                    response = tokenbuf[0]
+                    break
+
+        if response >= 0:
+            # this could be a big-endian integer that we are getting here
+            # if final<0 then store the first byte to tokenbuf and discard the rest
+            if final < 0:
+                if avail:
+                    tokenbuf[0] = resp[8 - avail]
+                    avail -= 1
+                else:
+                    spi_readinto(tokenbuf, 0xFF)
+                final = -1 - final
+            if final > avail:
+                # discard the remaining trailer bytes in one transaction
+                self.spi.write(self.dummybuf_memoryview[: final - avail])
+            if release:
+                self.cs(1)
+                self.spi.write(_FF1)
+            return response
 
         # timeout
         self.cs(1)
-        self.spi.write(b"\xff")
+        self.spi.write(_FF1)
         return -1
 
+    @micropython.native
     def readinto(self, buf):
         self.cs(0)
 
-        # read until start byte (0xff)
-        for i in range(_CMD_TIMEOUT):
-            self.spi.readinto(self.tokenbuf, 0xFF)
-            if self.tokenbuf[0] == _TOKEN_DATA:
+        # read until start byte (0xfe): scan in 16-byte batches without delay
+        # first, since fast cards present the token within a few clocked bytes
+        # and both a 1 ms sleep and a per-byte SPI call would dominate small
+        # reads; back off to sleeping single-byte polls if the card is still
+        # busy after the spin (trades a short CPU burn for latency)
+        len_buf = len(buf)
+        scan = self.pollbuf
+        spill = 0  # data bytes already clocked in behind the token
+        for i in range(_FAST_SPIN // 16):
+            self.spi.write_readinto(self.pollsrc, scan)
+            idx = scan.find(_TOKEN_DATA_B)
+            if idx >= 0:
+                # keep whatever part of the data followed the token in
+                # this batch (pre-token bytes are all 0xff)
+                spill = 15 - idx
+                if spill > len_buf:
+                    spill = len_buf
+                if spill:
+                    buf[0:spill] = scan[idx + 1 : idx + 1 + spill]
                 break
-            time.sleep_ms(1)
         else:
-            self.cs(1)
-            raise OSError("timeout waiting for response")
+            tokenbuf = self.tokenbuf
+            spi_readinto = self.spi.readinto
+            for i in range(_CMD_TIMEOUT):
+                spi_readinto(tokenbuf, 0xFF)
+                if tokenbuf[0] == _TOKEN_DATA:
+                    break
+                time.sleep_ms(1)
+            else:
+                self.cs(1)
+                raise OSError("timeout waiting for response")
 
         # read data
-        mv = self.dummybuf_memoryview
-        if len(buf) != len(mv):
-            mv = mv[: len(buf)]
-        self.spi.write_readinto(mv, buf)
+        remaining = len_buf - spill
+        if remaining:
+            mv = self.dummybuf_memoryview
+            if remaining != len(mv):
+                mv = mv[:remaining]
+            if spill:
+                self.spi.write_readinto(mv, memoryview(buf)[spill:])
+            else:
+                self.spi.write_readinto(mv, buf)
 
-        # read checksum
-        self.spi.write(b"\xff")
-        self.spi.write(b"\xff")
+        # read checksum in a single two-byte transaction
+        self.spi.write(_FF2)
 
         self.cs(1)
-        self.spi.write(b"\xff")
+        self.spi.write(_FF1)
 
+    @micropython.native
     def write(self, token, buf):
         self.cs(0)
 
-        # send: start of block, data, checksum
-        self.spi.read(1, token)
-        self.spi.write(buf)
-        self.spi.write(b"\xff")
-        self.spi.write(b"\xff")
+        # send start of block, data and checksum as one transaction; the
+        # 512-byte copy into the staging buffer is cheaper than the extra
+        # per-transfer SPI setup of three separate writes
+        wbuf = self._writebuf
+        wbuf[0] = token
+        wbuf[1:513] = buf
+        self.spi.write(wbuf)
 
         # check the response
         if (self.spi.read(1, 0xFF)[0] & 0x1F) != 0x05:
             self.cs(1)
-            self.spi.write(b"\xff")
+            self.spi.write(_FF1)
             return
 
-        # wait for write to finish
-        while self.spi.read(1, 0xFF)[0] == 0:
-            pass
+        # wait for write to finish, polling 16 bytes per SPI transaction.
+        # The card holds DO low while busy, so once the last byte of a batch
+        # is non-zero the card is ready; overshooting a few clocks is harmless.
+        poll = self.pollbuf
+        src = self.pollsrc
+        while True:
+            self.spi.write_readinto(src, poll)
+            if poll[-1] != 0:
+                break
 
         self.cs(1)
-        self.spi.write(b"\xff")
+        self.spi.write(_FF1)
 
+    @micropython.native
     def write_token(self, token):
         self.cs(0)
         self.spi.read(1, token)
-        self.spi.write(b"\xff")
-        # wait for write to finish
-        while self.spi.read(1, 0xFF)[0] == 0x00:
-            pass
+        self.spi.write(_FF1)
+        # wait for write to finish (batched, see write())
+        poll = self.pollbuf
+        src = self.pollsrc
+        while True:
+            self.spi.write_readinto(src, poll)
+            if poll[-1] != 0:
+                break
 
         self.cs(1)
-        self.spi.write(b"\xff")
+        self.spi.write(_FF1)
+
+    def _read_block(self, block_num, buf):
+        """Fetch one full block with CMD17 straight into buf, bypassing the
+        readblocks dispatch and its cache-hit bookkeeping. The caller is
+        responsible for updating cache_block/cache_dirty if buf is the cache."""
+        if self.cache_dirty:
+            self.sync()
+        # ensure MOSI is high before starting transaction (shared-bus quirk)
+        self.spi.write(_FF1)
+        if self.cmd(17, block_num * self.cdv, 0, release=False) != 0:
+            self.cs(1)
+            raise OSError(5)  # EIO
+        self.readinto(buf)
 
     def rbdevice(self, block_num, buf, offset=0):
         """DEBUG. For testing purposes, read a block from the device, bypassing the cache"""
@@ -293,7 +429,7 @@ class SDCard:
             miss_left = offset > 0 and (offset + len_buf) % 512 == 0
             miss_right = offset == 0 and (offset + len_buf) % 512 > 0
             miss_both = offset > 0 and (offset + len_buf) % 512 > 0
-            self.stats.collect(
+            self._collect(
                 "rb",
                 length=len_buf,
                 nblocks=nblocks,
@@ -310,10 +446,27 @@ class SDCard:
         if nblocks == 1:
             # Only one block to read (partial or complete)
             if cache_miss:
-                self.sync()
+                if offset == 0 and len_buf == 512:
+                    # Aligned full block: read straight into the caller's
+                    # buffer, skipping the cache populate and 512-byte copy.
+                    # The cache keeps whatever block it already held — even a
+                    # dirty one: this read never touches the cache buffer and
+                    # block_num != cache_block here, so the write-back can stay
+                    # deferred until a path that actually needs it (or ioctl(3))
+                    # flushes, saving a CMD24 per interleaved read.
+                    self.spi.write(_FF1)
+                    if self.cmd(17, block_num * self.cdv, 0, release=False) != 0:
+                        self.cs(1)
+                        raise OSError(5)  # EIO
+                    self.readinto(mv_buf)
+                    return
+                # Checking the dirty flag here keeps the clean-cache miss from
+                # paying a no-op sync() call on every read.
+                if self.cache_dirty:
+                    self.sync()
                 # workaround for shared bus, required for (at least) some Kingston
                 # devices, ensure MOSI is high before starting transaction
-                self.spi.write(b"\xff")
+                self.spi.write(_FF1)
                 # CMD17: set read address for single block
                 if self.cmd(17, block_num * self.cdv, 0, release=False) != 0:
                     # release the card
@@ -329,6 +482,13 @@ class SDCard:
         else:
             # More than one block to read
             # TODO: Implement a cache for multiple blocks, if it's worth it. For LFS2, apparently it's not.
+            # Flush before starting the CMD18 stream if the cache buffer is
+            # about to be reused for the head block or the dirty block itself
+            # falls inside the read range (sync would abort the stream later).
+            if self.cache_dirty and (
+                offset > 0 or block_num <= self.cache_block < block_num + nblocks
+            ):
+                self.sync()
             # CMD18: set read address for multiple blocks
 
             if self.cmd(18, block_num * self.cdv, 0, release=False) != 0:
@@ -337,34 +497,73 @@ class SDCard:
                 raise OSError(5)  # EIO
 
             bytes_read = 0
+            head_bytes = 0
+            readinto = self.readinto
 
             # Handle the initial partial block write if there's an offset
             if offset > 0:
-                self.readinto(mv_cache)
+                readinto(mv_cache)
                 # update cache info
                 self.cache_block = block_num
                 self.cache_dirty = False
-                bytes_from_first_block = 512 - offset
-                mv_buf[0:bytes_from_first_block] = mv_cache[offset:]
-                bytes_read += bytes_from_first_block
-
-            # Read full blocks if any
+                head_bytes = 512 - offset
+                mv_buf[0:head_bytes] = mv_cache[offset:]
+                bytes_read += head_bytes
+
+            # Read full blocks if any. Each block in the CMD18 stream is
+            # fetched as one 515-byte transfer (token + data + CRC) instead of
+            # re-entering readinto's token wait per block. The card may insert
+            # idle bytes before the token, shifting it inside the window, so
+            # the copy-out adjusts to wherever the token actually landed.
+            streambuf = self._streambuf
+            mvs = self._mv_streambuf
+            dummy = self.dummybuf_memoryview
             while bytes_read + 512 <= len_buf:
-                self.readinto(mv_buf[bytes_read : bytes_read + 512])
-                bytes_read += 512
+                end = bytes_read + 512
+                self.spi.write_readinto(self._streamsrc, streambuf)
+                if streambuf[0] == _TOKEN_DATA:
+                    # common case: token first, data and CRC fully clocked
+                    mv_buf[bytes_read:end] = mvs[1:513]
+                else:
+                    idx = streambuf.find(_TOKEN_DATA_B)
+                    if idx < 0:
+                        # token not seen in this window, wait for it normally
+                        readinto(mv_buf[bytes_read:end])
+                    else:
+                        have = 514 - idx  # bytes clocked in behind the token
+                        if have >= 512:
+                            mv_buf[bytes_read:end] = mvs[idx + 1 : idx + 513]
+                            # clock out whatever part of the CRC is still due
+                            if have < 514:
+                                self.spi.write(dummy[: 514 - have])
+                        else:
+                            mv_buf[bytes_read : bytes_read + have] = mvs[idx + 1 :]
+                            self.spi.write_readinto(
+                                dummy[: 512 - have], mv_buf[bytes_read + have : end]
+                            )
+                            self.spi.write(_FF2)
+                bytes_read = end
 
             # Handle the las partial block if needed
-            if bytes_read < len_buf:
-                self.readinto(mv_buf[bytes_read:])
+            had_tail = bytes_read < len_buf
+            if had_tail:
+                readinto(mv_buf[bytes_read:])
 
             # End the transmission
-            if self.cmd(12, 0, 0xFF, skip1=True):
+            if self._cmd_packet(_CMD12_PKT, skip1=True):
                 raise OSError(5)  # EIO
 
+            # Keep the last fully-read block cached: LFS metadata scans tend
+            # to re-read the block they just went through. Only when the
+            # cache is clean, so no write-back is forced here.
+            if not self.cache_dirty and bytes_read - head_bytes >= 512:
+                mv_cache[:] = mv_buf[bytes_read - 512 : bytes_read]
+                self.cache_block = block_num + nblocks - 1 - (1 if had_tail else 0)
+
     def writeblocks(self, block_num, buf, offset=0):
         # workaround for shared bus, required for (at least) some Kingston
         # devices, ensure MOSI is high before starting transaction
-        self.spi.write(b"\xff")
+        self.spi.write(_FF1)
 
         if offset < 0:
             raise ValueError("writeblocks: Offset must be non-negative")
@@ -385,7 +584,7 @@ class SDCard:
             miss_left = offset > 0 and (offset + len_buf) % 512 == 0
             miss_right = offset == 0 and (offset + len_buf) % 512 > 0
             miss_both = offset > 0 and (offset + len_buf) % 512 > 0
-            self.stats.collect(
+            self._collect(
                 "wb",
                 length=len_buf,
                 nblocks=nblocks,
@@ -403,7 +602,18 @@ class SDCard:
 
         if nblocks == 1:
             if cache_miss:
-                self.readblocks(block_num, mv_cache)
+                if offset == 0 and len_buf == 512:
+                    # Aligned full block on a miss: flush the unrelated dirty
+                    # block if any and program the card directly, leaving the
+                    # cached block (a different one) intact.
+                    if self.cache_dirty:
+                        self.sync()
+                    if self.cmd(24, block_num * self.cdv, 0) != 0:
+                        raise OSError(5)  # EIO
+                    self.write(_TOKEN_DATA, mv_buf)
+                    return
+                self._read_block(block_num, mv_cache)
+                self.cache_block = block_num
                 mv_cache[offset : offset + len_buf] = buf
                 self.cache_dirty = True
             else:
@@ -413,22 +623,28 @@ class SDCard:
         else:
             # No caching in multiblock writes
             # Consider implementing a cache for multiple blocks if it's worth it
-            self.sync()
+            if self.cache_dirty:
+                self.sync()
 
             bytes_written = 0
+            first_block = block_num
+            write = self.write
 
             # Cache first and last block if needed
             if first_misaligned:
-                self.readblocks(block_num, mv_cache)
+                self._read_block(block_num, mv_cache)
+                self.cache_block = block_num
+                self.cache_dirty = False
                 if last_misaligned:
                     # Both first and last blocks are misaligned
-                    # Consider preallocate y this is frequent. I doubt it.
-                    mv_cache2 = memoryview(bytearray(512))
-                    self.readblocks(block_num + nblocks - 1, mv_cache2)
+                    mv_cache2 = self.mv_cache2
+                    self._read_block(block_num + nblocks - 1, mv_cache2)
             else:
                 if last_misaligned:
                     # Only Last block is misaligned, do not allocate another cache
-                    self.readblocks(block_num + nblocks - 1, mv_cache)
+                    self._read_block(block_num + nblocks - 1, mv_cache)
+                    self.cache_block = block_num + nblocks - 1
+                    self.cache_dirty = False
 
             # More than one block to write (partial or complete)
             # CMD25: set write address for first block
@@ -440,14 +656,15 @@ class SDCard:
                 bytes_for_first_block = 512 - offset
                 # Update block content
                 mv_cache[offset:] = mv_buf[0:bytes_for_first_block]
-                self.write(_TOKEN_CMD25, mv_cache)
+                write(_TOKEN_CMD25, mv_cache)
                 bytes_written += bytes_for_first_block
                 block_num += 1
 
             # Write full blocks if any
             while bytes_written + 512 <= len_buf:
-                self.write(_TOKEN_CMD25, mv_buf[bytes_written : bytes_written + 512])
-                bytes_written += 512
+                end = bytes_written + 512
+                write(_TOKEN_CMD25, mv_buf[bytes_written:end])
+                bytes_written = end
                 block_num += 1
 
             # Handle the last partial block if needed
@@ -456,17 +673,24 @@ class SDCard:
                 if first_misaligned:
                     # Cached block is in cache2
                     mv_cache2[0 : len_buf - bytes_written] = mv_buf[bytes_written:]  # type: ignore
-                    self.write(_TOKEN_CMD25, mv_cache2)  # type: ignore
+                    write(_TOKEN_CMD25, mv_cache2)  # type: ignore
                 else:
                     # Cached block is in cache
                     mv_cache[0 : len_buf - bytes_written] = mv_buf[bytes_written:]
-                    self.write(_TOKEN_CMD25, mv_cache)
+                    write(_TOKEN_CMD25, mv_cache)
 
             # End the transation
             self.write_token(_TOKEN_STOP_TRAN)
 
-            # Invalidate ani cache hit after multiblock write for the moment
-            # self.cache_block = -1
+            # A previously cached block inside the written range is stale now.
+            # The head/tail images staged in mv_cache by the misaligned paths
+            # hold the just-written content, so those stay valid.
+            if (
+                not first_misaligned
+                and not last_misaligned
+                and first_block <= self.cache_block < first_block + nblocks
+            ):
+                self.cache_block = -1
 
     def sync(self):
         mv_cache = self.mv_cache
@@ -475,82 +699,94 @@ class SDCard:
             # CMD24: set write address for single block
             # print("DEBUG sync: Writing cached block", self.cache_block)  # fmt: skip
             if self.debug:
-                self.stats.stats["auto_sync"] += 1
+                self.stats.auto_sync += 1
             if self.cmd(24, self.cache_block * self.cdv, 0) != 0:
                 raise OSError(5)  # EIO
             self.write(_TOKEN_DATA, mv_cache)
             self.cache_dirty = False
 
+    def _op_sync(self):
+        self.sync()
+        return 0
+
+    def _op_num_blocks(self):
+        return self.sectors
+
+    def _op_block_size(self):
+        return 512
+
+    def _op_erase_block(self):
+        # Erase is handled by the controller
+        return 0
+
     def ioctl(self, op, arg):
-        if self.debug:
-            self.stats.collect("ioctl", ioctl=op)
-        if op == 3:  # sync
-            self.sync()
-            return 0
-        if op == 4:  # get number of blocks
-            return self.sectors
-        if op == 5:  # get block size in bytes
-            return 512
-        if op == 6:  # Ersase block, handled by the controller
-            return 0
+        self._collect("ioctl", ioctl=op)
+        handler = self._ioctl_table[op] if op < 7 else None
+        if handler is not None:
+            return handler()
 
     class Stats:
-        """Collect statistics about readblocks and writeblocks calls for debugging purposes"""
+        """Collect statistics about readblocks and writeblocks calls for debugging purposes.
+        Counters are plain instance attributes instead of dict entries: attribute
+        stores are cheaper than hashed dict lookups on the per-block hot path."""
+
+        # (attribute, printed label) in report order
+        _FIELDS = (
+            ("samples", "samples"),
+            ("cache_size", "cache_size"),
+            ("rb", "rb"),
+            ("rb_single", "rb_single"),
+            ("rb_single_aligned", "rb_single_aligned"),
+            ("rb_single_miss_left", "rb_single_miss_left"),
+            ("rb_single_miss_right", "rb_single_miss_right"),
+            ("rb_single_miss_both", "rb_single_miss_both"),
+            ("rb_single_min", "rb_single_min"),
+            ("rb_single_max", "rb_single_max"),
+            ("rb_single_avg", "rb_single_avg"),
+            ("rb_multi", "rb_multi"),
+            ("rb_multi_aligned", "rb_multi_aligned"),
+            ("rb_multi_miss_left", "rb_multi_miss_left"),
+            ("rb_multi_miss_right", "rb_multi_miss_right"),
+            ("rb_multi_miss_both", "rb_multi_miss_both"),
+            ("rb_multi_min", "rb_multi_min"),
+            ("rb_multi_max", "rb_multi_max"),
+            ("rb_multi_avg", "rb_multi_avg"),
+            ("rb_cache_hit", "rb_cache_hit"),
+            ("rb_cache_miss", "rb_cache_miss"),
+            ("wb", "wb"),
+            ("wb_single", "wb_single"),
+            ("wb_single_aligned", "wb_single_aligned"),
+            ("wb_single_miss_left", "wb_single_miss_left"),
+            ("wb_single_miss_right", "wb_single_miss_right"),
+            ("wb_single_miss_both", "wb_single_miss_both"),
+            ("wb_single_min", "wb_single_min"),
+            ("wb_single_max", "wb_single_max"),
+            ("wb_single_avg", "wb_single_avg"),
+            ("wb_multi", "wb_multi"),
+            ("wb_multi_aligned", "wb_multi_aligned"),
+            ("wb_multi_miss_left", "wb_multi_miss_left"),
+            ("wb_multi_miss_right", "wb_multi_miss_right"),
+            ("wb_multi_miss_both", "wb_multi_miss_both"),
+            ("wb_multi_min", "wb_multi_min"),
+            ("wb_multi_max", "wb_multi_max"),
+            ("wb_multi_avg", "wb_multi_avg"),
+            ("wb_cache_hit", "wb_cache_hit"),
+            ("wb_cache_miss", "wb_cache_miss"),
+            ("ioctl_sync", "ioctl(3) sync"),
+            ("ioctl_num_blocks", "ioctl(4) num_blocks"),
+            ("ioctl_block_size", "ioctl(5) block_size"),
+            ("ioctl_erase_block", "ioctl(6) erase_block"),
+            ("auto_sync", "auto_sync"),
+        )
 
         def __init__(self):
-            from collections import OrderedDict
-
             self.show_every = 0
-            self.samples = 0
-            self.stats = OrderedDict(
-                {
-                    "samples": 0,
-                    "cache_size": 0,
-                    "rb": 0,
-                    "rb_single": 0,
-                    "rb_single_aligned": 0,
-                    "rb_single_miss_left": 0,
-                    "rb_single_miss_right": 0,
-                    "rb_single_miss_both": 0,
-                    "rb_single_min": 9999999,
-                    "rb_single_max": 0,
-                    "rb_single_avg": 0,
-                    "rb_multi": 0,
-                    "rb_multi_aligned": 0,
-                    "rb_multi_miss_left": 0,
-                    "rb_multi_miss_right": 0,
-                    "rb_multi_miss_both": 0,
-                    "rb_multi_min": 9999999,
-                    "rb_multi_max": 0,
-                    "rb_multi_avg": 0,
-                    "rb_cache_hit": 0,
-                    "rb_cache_miss": 0,
-                    "wb": 0,
-                    "wb_single": 0,
-                    "wb_single_aligned": 0,
-                    "wb_single_miss_left": 0,
-                    "wb_single_miss_right": 0,
-                    "wb_single_miss_both": 0,
-                    "wb_single_min": 9999999,
-                    "wb_single_max": 0,
-                    "wb_single_avg": 0,
-                    "wb_multi": 0,
-                    "wb_multi_aligned": 0,
-                    "wb_multi_miss_left": 0,
-                    "wb_multi_miss_right": 0,
-                    "wb_multi_miss_both": 0,
-                    "wb_multi_min": 9999999,
-                    "wb_multi_max": 0,
-                    "wb_multi_avg": 0,
-                    "wb_cache_hit": 0,
-                    "wb_cache_miss": 0,
-                    "ioctl(3) sync": 0,
-                    "ioctl(4) num_blocks": 0,
-                    "ioctl(5) block_size": 0,
-                    "ioctl(6) erase_block": 0,
-                    "auto_sync": 0,
-                }
-            )
+            for attr, _ in self._FIELDS:
+                setattr(self, attr, 0)
+            self.rb_single_min = 9999999
+            self.rb_multi_min = 9999999
+            self.wb_single_min = 9999999
+            self.wb_multi_min = 9999999
 
         def collect(
             self,
@@ -567,74 +803,76 @@ class SDCard:
             self.samples += 1
             if self.show_every != 0 and self.samples % self.show_every == 0:
                 self.print_stats()
-            # noqa
-            s = self.stats
-            s["samples"] += 1
             if op == "rb":
-                s["rb"] += 1
-                s["rb_cache_hit"] += 1 if cache_hit else 0
-                s["rb_cache_miss"] += 1 if not cache_hit else 0
+                self.rb += 1
+                self.rb_cache_hit += cache_hit
+                self.rb_cache_miss += not cache_hit
                 if nblocks == 1:
-                    s["rb_single"] += 1
-                    s["rb_single_aligned"] += 1 if aligned else 0
-                    s["rb_single_miss_left"] += 1 if miss_left else 0
-                    s["rb_single_miss_right"] += 1 if miss_right else 0
-                    s["rb_single_miss_both"] += 1 if miss_both else 0
-
-                    s["rb_single_min"] = min(s["rb_single_min"], length)
-                    s["rb_single_max"] = max(s["rb_single_max"], length)
-                    s["rb_single_avg"] = s["rb_single_avg"] + (length - s["rb_single_avg"]) / s["rb_single"]  # fmt: skip
+                    self.rb_single += 1
+                    self.rb_single_aligned += aligned
+                    self.rb_single_miss_left += miss_left
+                    self.rb_single_miss_right += miss_right
+                    self.rb_single_miss_both += miss_both
+                    if length < self.rb_single_min:
+                        self.rb_single_min = length
+                    if length > self.rb_single_max:
+                        self.rb_single_max = length
+                    self.rb_single_avg += (length - self.rb_single_avg) / self.rb_single
                 else:
-                    s["rb_multi"] += 1
-                    s["rb_multi_aligned"] += 1 if aligned else 0
-                    s["rb_multi_miss_left"] += 1 if miss_left else 0
-                    s["rb_multi_miss_right"] += 1 if miss_right else 0
-                    s["rb_multi_miss_both"] += 1 if miss_both else 0
-                    s["rb_multi_min"] = min(s["rb_multi_min"], length)
-                    s["rb_multi_max"] = max(s["rb_multi_max"], length)
-                    s["rb_multi_avg"] = s["rb_multi_avg"] + (length - s["rb_multi_avg"]) / s["rb_multi"]  # fmt: skip
+                    self.rb_multi += 1
+                    self.rb_multi_aligned += aligned
+                    self.rb_multi_miss_left += miss_left
+                    self.rb_multi_miss_right += miss_right
+                    self.rb_multi_miss_both += miss_both
+                    if length < self.rb_multi_min:
+                        self.rb_multi_min = length
+                    if length > self.rb_multi_max:
+                        self.rb_multi_max = length
+                    self.rb_multi_avg += (length - self.rb_multi_avg) / self.rb_multi
             elif op == "wb":
-                s["wb"] += 1
-                s["wb_cache_hit"] += 1 if cache_hit else 0
-                s["wb_cache_miss"] += 1 if not cache_hit else 0
+                self.wb += 1
+                self.wb_cache_hit += cache_hit
+                self.wb_cache_miss += not cache_hit
                 if nblocks == 1:
-                    s["wb_single"] += 1
-                    s["wb_single_aligned"] += 1 if aligned else 0
-                    s["wb_single_miss_left"] += 1 if miss_left else 0
-                    s["wb_single_miss_right"] += 1 if miss_right else 0
-                    s["wb_single_miss_both"] += 1 if miss_both else 0
-
-                    s["wb_single_min"] = min(s["wb_single_min"] or 1e5, length)
-                    s["wb_single_max"] = max(s["wb_single_max"] or 0, length)
-                    s["wb_single_avg"] = s["wb_single_avg"] + (length - s["wb_single_avg"]) / s["wb_single"]  # fmt: skip
+                    self.wb_single += 1
+                    self.wb_single_aligned += aligned
+                    self.wb_single_miss_left += miss_left
+                    self.wb_single_miss_right += miss_right
+                    self.wb_single_miss_both += miss_both
+                    if length < self.wb_single_min:
+                        self.wb_single_min = length
+                    if length > self.wb_single_max:
+                        self.wb_single_max = length
+                    self.wb_single_avg += (length - self.wb_single_avg) / self.wb_single
                 else:
-                    s["wb_multi"] += 1
-                    s["wb_multi_aligned"] += 1 if aligned else 0
-                    s["wb_multi_miss_left"] += 1 if miss_left else 0
-                    s["wb_multi_miss_right"] += 1 if miss_right else 0
-                    s["wb_multi_miss_both"] += 1 if miss_both else 0
-                    s["wb_multi_min"] = min(s["wb_multi_min"] or 1e9, length)
-                    s["wb_multi_max"] = max(s["wb_multi_max"] or 0, length)
-                    s["wb_multi_avg"] = s["wb_multi_avg"] + (length - s["wb_multi_avg"]) / s["wb_multi"]  # fmt: skip
+                    self.wb_multi += 1
+                    self.wb_multi_aligned += aligned
+                    self.wb_multi_miss_left += miss_left
+                    self.wb_multi_miss_right += miss_right
+                    self.wb_multi_miss_both += miss_both
+                    if length < self.wb_multi_min:
+                        self.wb_multi_min = length
+                    if length > self.wb_multi_max:
+                        self.wb_multi_max = length
+                    self.wb_multi_avg += (length - self.wb_multi_avg) / self.wb_multi
             elif op == "ioctl":
                 if ioctl == 3:
-                    s["ioctl(3) sync"] += 1
+                    self.ioctl_sync += 1
                 elif ioctl == 4:
-                    s["ioctl(4) num_blocks"] += 1
+                    self.ioctl_num_blocks += 1
                 elif ioctl == 5:
-                    s["ioctl(5) block_size"] += 1
+                    self.ioctl_block_size += 1
                 elif ioctl == 6:
-                    s["ioctl(6) erase_block"] += 1
-
-            # noqa
+                    self.ioctl_erase_block += 1
 
         def print_stats(self):
             print("-" * 40)
             print("SDCard readblocks and writeblocks Stats")
-            for key, value in self.stats.items():
+            for attr, label in self._FIELDS:
+                value = getattr(self, attr)
                 if value is None:
                     value = "N/A"
-                print(f"{key:<20}: {value:>10}")
+                print(f"{label:<20}: {value:>10}")
             print("-" * 40)
 
         def clear(self):
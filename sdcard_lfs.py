@@ -30,9 +30,14 @@ Update @jornamon 2024:
   algorithm and implement different policies for testing or fine tunning. For now, only Least Recently Used (LRU) 
   and Least Recently Used Clean (LRUC) are implemented.
 - Implement a configurable Read Ahead feature, which can be set to 1 (no read ahead), or any number of blocks to
-  read ahead.
+  read ahead. Read ahead only kicks in on sequential misses (a miss right after the previously fetched block),
+  skips blocks already cached, is clipped at the end of the device, and the refill is fetched as one CMD18
+  multiblock read when the target slots are adjacent.
 - Debug and analysis features can be now enable / disable through debug_flags kwarg when instantiating the driver.
   Sea docs for details. Be carefull, enabling debug features dramatically slows down the driver.
+- Per-call I/O shape stats are gated behind the module-level _PROFILE constant (a build-time flag: edit it to
+  const(True) before deploying an instrumented build). With const(False) the bytecode compiler deletes those
+  branches from readblocks/writeblocks entirely, so production builds pay nothing for them.
 - The basic usage signature is the same as the original driver, but now it accepts a few more optional arguments to
   configure the cache and debug features.
   
@@ -61,9 +66,15 @@ except ImportError:
     pass
 
 import time
+import micropython
 from micropython import const
+from array import array
 from collections import OrderedDict
 
+# MicroPython's OrderedDict has no move_to_end; CPython's (and any future
+# port that grows one) refreshes an entry without the pop/reinsert rehash
+_MOVE_TO_END = getattr(OrderedDict, "move_to_end", None)
+
 
 _CMD_TIMEOUT = const(100)
 _R1_IDLE_STATE = const(1 << 0)
@@ -76,41 +87,35 @@ _R1_ILLEGAL_COMMAND = const(1 << 2)
 _TOKEN_CMD25 = const(0xFC)
 _TOKEN_STOP_TRAN = const(0xFD)
 _TOKEN_DATA = const(0xFE)
-
-
-class LRMDict(OrderedDict):
-    """An ordered dict with some special features usefull for block cache management:
-    - Every Modified item goes by default goes to the end of the dict (most recently modified)
-    - move_to_end method moves a specific item to the end of the dictionary.
-    - popitem method pops the last item by default, but can also pop the first item.
-    """
-
-    def __setitem__(self, key, value):
-        super().__setitem__(key, value)
-        v = self.pop(key)
-        self.update({key: v})
-
-    def move_to_end(self, key):
-        v = self.pop(key)
-        self.update({key: v})
-
-    def popitem(self, last=True):
-        if last:
-            return super().popitem()
-        else:
-            k = next(iter(self))
-            return k, self.pop(k)
+# block size is fixed at 512 throughout: shift/mask instead of div/mod,
+# and the cache hot paths use the const directly (a folded constant)
+# rather than loading self._block_size on every call
+_BLOCK_SIZE = const(512)
+_BLOCK_SHIFT = const(9)
+_BLOCK_MASK = const(0x1FF)
+# shared all-0xFF block for ioctl(6) erase, allocated once at import.
+# The memoryview hands the buffer protocol straight to slice-assign / put
+# (which always copy into the cached block, never keep the view).
+_ERASE_PATTERN = bytes(b"\xff" * 512)
+_ERASE_MV = memoryview(_ERASE_PATTERN)
+# gate for per-call I/O shape stats: const(False) lets the compiler drop
+# the collection branches entirely from the hot paths
+_PROFILE = const(False)
 
 
 class Block:
-    """A class to represent a block in the cache."""
+    """A class to represent a block in the cache.
+    slot is the index of the pool slice backing content (-1 for ad-hoc
+    blocks that point at a caller buffer); adjacent slots let the cache
+    batch transfers over one contiguous region."""
 
-    __slots__ = ["block_num", "dirty", "content"]
+    __slots__ = ["block_num", "dirty", "content", "slot"]
 
-    def __init__(self, block_num: int, dirty: bool, content: memoryview):
+    def __init__(self, block_num: int, dirty: bool, content: memoryview, slot: int = -1):
         self.block_num = block_num
         self.dirty = dirty
         self.content = content
+        self.slot = slot
 
     def __str__(self):
         return f"Block({self.block_num}, {self.dirty})"
@@ -124,7 +129,15 @@ class Cache:
     """A class to represent a block cache. Now separeted from the SDCard class
     to facilitate device independent testing a potential reuse.
     Cache works only with full blocks. Partial blocks are handled by the Device Driver.
-    """
+
+    Metadata layout: one hashed lookup resolves everything about a cached
+    block. _blocks is an OrderedDict mapping block_num -> Block, whose
+    insertion order doubles as the recency order, and each Block record
+    carries its slot, dirty flag and content view - there are no parallel
+    per-slot arrays to keep in step. The only auxiliary container is the
+    _dirty map (block_num -> Block), maintained on dirty transitions so
+    sync and the LRUC scan run over the dirty set instead of the whole
+    cache."""
 
     def __init__(
         self,
@@ -135,103 +148,203 @@ class Cache:
         read_ahead: int = 1,
         **debug_flags,
     ):
+        if block_size != _BLOCK_SIZE:
+            raise ValueError("Cache is specialized for 512-byte blocks")
         self._block_size = block_size
         self._cache_max_size = cache_max_size
         self._eviction_policy = eviction_policy.upper()
+        self._select_evictor()
         if read_ahead < 1 or read_ahead > cache_max_size // 2:
             raise ValueError("Read ahead must be between 1 and cache_max_size // 2")
         self._read_ahead = read_ahead
         self._debug_flags = debug_flags
         self.a: Analytics  # type: ignore # Will be populated by the SDCard class
 
-        self._cache: list[bytearray] = [bytearray(block_size) for _ in range(cache_max_size)]
-        self._blocks: LRMDict = LRMDict()
+        # Single contiguous allocation backing all cache slots: one big
+        # bytearray instead of N small ones is kinder to fragmented heaps and
+        # lets adjacent slots act as one buffer for batched multi-block reads.
+        self._pool = bytearray(block_size * cache_max_size)
+        self._mv_pool = memoryview(self._pool)
+        self._cache: list[memoryview] = [
+            self._mv_pool[i * block_size : (i + 1) * block_size] for i in range(cache_max_size)
+        ]
+        # One long-lived Block per slot, created up front. Miss paths reinit
+        # block_num/dirty on the slot's Block instead of allocating, so the
+        # hot path never constructs Block or memoryview objects. Slots fill
+        # in order and only recycle through eviction, so len(_blocks) is the
+        # next free slot and no free list is needed.
+        self._slots: list[Block] = [
+            Block(-1 - i, False, self._cache[i], i) for i in range(cache_max_size)
+        ]
+        # Recency order is the dict insertion order (plain OrderedDict: one
+        # native insert per update instead of LRMDict's pop+update churn).
+        self._blocks: OrderedDict = OrderedDict()
+        # dirty blocks by block_num, so sync scans O(dirty) not O(cache)
+        self._dirty: dict = {}
+        # block_num of the newest entry, so touching the MRU block is free
+        self._mru = -1
+        # last block fetched by a miss, to tell sequential misses from random
+        self._last_miss_block = -1
         self._device = device
+        # device size in blocks, set by the driver once the card reports its
+        # geometry (the cache is built before card init). Used to clip
+        # read-ahead at the end of the device.
+        self._sectors = 0
+        # block-to-address multiplier (device.cdv), copied here after card
+        # init so the I/O paths don't chase the device attribute per call
+        self._cdv = 1
+        # card erase-block size in sectors (64 KB default); sync bridges
+        # gaps between dirty runs only within one erase block, where the
+        # card would pay an internal read-modify-erase for split writes
+        self.erase_block_sectors = 128
+
+    def _touch(self, block_num: int) -> None:
+        """Mark block_num as most recently used (reinsert at the end).
+        Skipped entirely when the block is already the freshest."""
+        if block_num != self._mru:
+            if _MOVE_TO_END is None:
+                blocks = self._blocks
+                blocks[block_num] = blocks.pop(block_num)
+            else:
+                _MOVE_TO_END(self._blocks, block_num)
+            self._mru = block_num
 
-    def block_evictor(self, nblocks: int) -> list[Block]:
-        """Selects nblocks blocks to be evicted from cache according to active eviction policy.
-        Returns the list of evicted Blocks."""
-
-        blocks = self._blocks
+    def _select_evictor(self) -> None:
+        """Bind block_evictor to the implementation of the configured policy,
+        so evictions pay no per-call policy dispatch."""
         if self._eviction_policy == "LRU":
-            # Least Recently Used
-            evicted_blocks = list(blocks.values())[:nblocks]
-            # self.a.log(f"->block_evictor({nblocks}) LRU, returned {evicted_blocks}")  # fmt: skip
-            return evicted_blocks
-
+            self.block_evictor = self._evict_lru
         elif self._eviction_policy == "LRUC":
-            # Least Recently Used *Clean* block
-            clean_blocks = []
-            for block in blocks.values():
-                if not block.dirty:
-                    clean_blocks.append(block)
-                    if len(clean_blocks) == nblocks:
-                        # self.a.log(f"->block_evictor({nblocks}) LRUC, returned {clean_blocks}")  # fmt: skip
-                        return clean_blocks
-            # Not enough clean blocks. Sync and return the oldest blocks (now clean)
-            # self.a.log(f"->block_evictor({nblocks}) LRUC, not enough clean blocks, syncing")  # fmt: skip
-            self.sync()
-            evicted_blocks = list(blocks.values())[:nblocks]
-            # self.a.log(f"->block_evictor({nblocks}) LRUC, returned {evicted_blocks}")  # fmt: skip
-            return evicted_blocks
+            self.block_evictor = self._evict_lruc
         else:
             raise ValueError(f"Unknown eviction policy {self._eviction_policy}")
 
+    @micropython.native
+    def _evict_lru(self, nblocks: int) -> list[Block]:
+        """Selects nblocks blocks to be evicted from cache, Least Recently Used.
+        Returns the list of evicted Blocks."""
+
+        blocks = self._blocks
+        # Least Recently Used: take the first nblocks in recency order
+        # without materializing every cached value (O(nblocks), not O(cache))
+        evicted_blocks = []
+        for block in blocks.values():
+            evicted_blocks.append(block)
+            if len(evicted_blocks) == nblocks:
+                break
+        # self.a.log(f"->block_evictor({nblocks}) LRU, returned {evicted_blocks}")  # fmt: skip
+        return evicted_blocks
+
+    @micropython.native
+    def _evict_lruc(self, nblocks: int) -> list[Block]:
+        """Selects nblocks blocks to be evicted from cache, Least Recently Used Clean.
+        Returns the list of evicted Blocks."""
+
+        blocks = self._blocks
+        # Least Recently Used *Clean* block. Clean-ness comes from the dirty
+        # map, so the scan stays on int keys instead of loading each Block's
+        # attributes.
+        dirty = self._dirty
+        clean_blocks = []
+        for num, block in blocks.items():
+            if num not in dirty:
+                clean_blocks.append(block)
+                if len(clean_blocks) == nblocks:
+                    # self.a.log(f"->block_evictor({nblocks}) LRUC, returned {clean_blocks}")  # fmt: skip
+                    return clean_blocks
+        # Not enough clean blocks. Sync and return the oldest blocks (now clean)
+        # self.a.log(f"->block_evictor({nblocks}) LRUC, not enough clean blocks, syncing")  # fmt: skip
+        self.sync()
+        evicted_blocks = []
+        for block in blocks.values():
+            evicted_blocks.append(block)
+            if len(evicted_blocks) == nblocks:
+                break
+        # self.a.log(f"->block_evictor({nblocks}) LRUC, returned {evicted_blocks}")  # fmt: skip
+        return evicted_blocks
+
+    @micropython.native
     def get(self, block_num: int, buf: memoryview) -> None:
-        """Get a block from cache."""
-        if buf and len(buf) != self._block_size:
-            raise ValueError(f"Buffer must be {self._block_size} bytes.")
+        """Get a block from cache.
+        buf must be exactly block_size bytes; all driver call sites pass
+        full-block views, so the check is only an assert (dropped under -O)."""
+        assert buf is None or len(buf) == _BLOCK_SIZE
 
         if self._cache_max_size == 0 and buf is not None:
             # No cache, bypass it
             # Bypass cache creating an adhoc block pointing to the buffer
-            self.read_from_device([Block(block_num, False, buf)])
+            self._read_one(Block(block_num, False, buf))
             return
         blocks = self._blocks
         ra = self._read_ahead
         max_size = self._cache_max_size
-        mvb = memoryview(buf)
+        read = self.read_from_device
 
         if block_num in blocks:
             # Cache hit, return result from cache
             # self.a.collect("cache/get/hit")  # fmt: skip
             # self.a.log(f"->cache/get/hit {block_num}")  # fmt: skip
 
-            mvb[:] = blocks[block_num].content[:]
-            blocks.move_to_end(block_num)
+            buf[:] = blocks[block_num].content
+            self._touch(block_num)
 
         else:
             # Cache miss
             # self.a.collect("cache/get/miss")  # fmt: skip
 
+            # Conditional prefetch: read ahead only when this miss continues
+            # the previous one. Random misses fetch a single block, so
+            # prefetch can't thrash the cache on scattered metadata access.
+            if ra > 1 and block_num != self._last_miss_block + 1:
+                ra = 1
+            # Avoid read ahead if any block to be read ahead is already in
+            # the cache (it may be dirty and must not be clobbered by a
+            # device read). Membership probes with early exit: no set or
+            # range materialization per miss, and block_num itself just missed.
+            if ra > 1 and any((block_num + i) in blocks for i in range(1, ra)):
+                # TODO consider a more sophisticated way to handle this. Worth it?
+                # self.a.log(f"->cache/get/miss read ahead avoided")  # fmt: skip
+                # self.a.collect(f"cache/get/miss/ra_avoided")  # fmt: skip
+                ra = 1
+            # Never read ahead past the end of the device
+            if ra > 1 and block_num + ra > self._sectors:
+                ra = self._sectors - block_num
+                if ra < 1:
+                    ra = 1
+
             cache_size = len(blocks)
             if cache_size == self._cache_max_size:
                 # self.a.collect("cache/get/miss/full")  # fmt: skip
                 # self.a.log(f"->cache/get/miss/full {block_num}")  # fmt: skip
 
                 # Cache is full, evict blocks
-                if set(blocks.keys()).intersection(range(block_num, block_num + ra)):
-                    # Avoid read ahead if any block to be read ahead is already in the cache.
-                    # TODO consider a more sophisticated way to handle this. Worth it?
-                    # self.a.log(f"->cache/get/miss/full read ahead avoided")  # fmt: skip
-                    # self.a.collect(f"cache/get/miss/full/ra_avoided")  # fmt: skip
-                    ra = 1
                 evicted_blocks = self.block_evictor(ra)
                 for i, block in enumerate(evicted_blocks):
                     if block.dirty:
                         # TODO This check could be eliminated if only LRUC is used. Or any policy that only returns clean blocks.
                         # Consider disabling LRU altogether
-                        # Also, could be optimized for multiblock writes if not eliminated.
                         # self.a.log(f"->cache/get/miss/full dirty block evicted, writting to device {block.block_num}")  # fmt: skip
-                        self.write_to_device([block])
+                        self._flush_dirty_run(block)
                     # Update block metadata and get from device
                     blocks.pop(block.block_num)
                     block.dirty = False
                     block.block_num = block_num + i
                     blocks[block.block_num] = block
-                self.read_from_device(evicted_blocks)
+                    self._mru = block.block_num
+                # Batch the refill when the victims happen to occupy adjacent
+                # pool slots (always true for a freshly filled cache).
+                n = len(evicted_blocks)
+                if n == 1:
+                    self._read_one(evicted_blocks[0])
+                else:
+                    contig = None
+                    s0 = evicted_blocks[0].slot
+                    if s0 >= 0 and all(evicted_blocks[i].slot == s0 + i for i in range(1, n)):
+                        contig = self._mv_pool[s0 << _BLOCK_SHIFT : (s0 + n) << _BLOCK_SHIFT]
+                    read(evicted_blocks, contig)
+                self._last_miss_block = evicted_blocks[-1].block_num
                 # self.a.log(f"->cache/get/miss/full cache blocks after operation {self._blocks}")  # fmt: skip
-                mvb[:] = evicted_blocks[0].content[:]
+                buf[:] = evicted_blocks[0].content
             else:
                 # Cache is not full, Create and add new blocks.
                 # self.a.collect(f"cache/get/miss/not_full")  # fmt: skip
@@ -242,38 +355,56 @@ class Cache:
                 )
                 # self.a.log(f"->cache/get/miss/not_full slots {list(slots)}")  # fmt: skip
                 new_blocks = []
+                slot_blocks = self._slots
                 for i, slot in enumerate(slots):
-                    b = Block(block_num + i, False, memoryview(self._cache[slot]))
+                    b = slot_blocks[slot]
+                    b.block_num = block_num + i
+                    b.dirty = False
                     new_blocks.append(b)
                     blocks[block_num + i] = b
-                self.read_from_device(new_blocks)
+                    self._mru = block_num + i
+                if len(new_blocks) > 1:
+                    # fresh slots are adjacent in the pool: one contiguous span
+                    contig = self._mv_pool[
+                        cache_size << _BLOCK_SHIFT : (cache_size + len(new_blocks)) << _BLOCK_SHIFT
+                    ]
+                    read(new_blocks, contig)
+                else:
+                    self._read_one(new_blocks[0])
+                self._last_miss_block = new_blocks[-1].block_num
                 # self.a.log(f"->cache/get/miss/not_full new blocks after operation {new_blocks}")  # fmt: skip
-                mvb[:] = new_blocks[0].content[:]
+                buf[:] = new_blocks[0].content
 
+    @micropython.native
     def put(self, block_num: int, buf: memoryview) -> None:
-        """Put a block into cache."""
-        if len(buf) != self._block_size:
-            raise ValueError(f"Buffer must be {self._block_size} bytes.")
+        """Put a block into cache.
+        buf must be exactly block_size bytes (see get).
+        The content is always copied: the cache must never keep a reference
+        to the caller's buffer, which the VFS reuses as soon as the call
+        returns. Large aligned writes avoid the copy by streaming straight
+        to the device through put_run instead."""
+        assert len(buf) == _BLOCK_SIZE
 
         # self.a.collect("cache/put")  # fmt: skip
 
         # No cache
         if self._cache_max_size == 0:
             # Bypass cache creating an adhoc block pointing to the buffer
-            self.write_to_device([Block(block_num, False, buf)])
+            self._write_one(Block(block_num, False, buf))
             return
 
         blocks = self._blocks
-        mvb = memoryview(buf)
 
         if block_num in blocks:
             # Cache hit
             # self.a.log(f"->cache/put/hit block num {block_num}")  # fmt: skip
             # self.a.collect("cache/put/hit")  # fmt: skip
 
-            blocks[block_num].content[:] = mvb[:]
-            blocks[block_num].dirty = True
-            blocks.move_to_end(block_num)
+            block = blocks[block_num]
+            block.content[:] = buf
+            block.dirty = True
+            self._dirty[block_num] = block
+            self._touch(block_num)
         else:
             # Cache miss
 
@@ -284,7 +415,7 @@ class Cache:
                 # Cache full, evict one block and write to it
                 evicted_block = self.block_evictor(1)[0]
                 if evicted_block.dirty:
-                    self.write_to_device([evicted_block])
+                    self._flush_dirty_run(evicted_block)
 
                 # self.a.collect("cache/put/miss/full")  # fmt: skip
                 # self.a.log(f"->cache/put/miss/full block {block_num}, evicting {evicted_block}, blocks {self._blocks}")  # fmt: skip
@@ -292,17 +423,74 @@ class Cache:
                 blocks.pop(evicted_block.block_num)
                 evicted_block.block_num = block_num
                 evicted_block.dirty = True
-                evicted_block.content[:] = mvb[:]
+                evicted_block.content[:] = buf
                 blocks[evicted_block.block_num] = evicted_block
+                self._dirty[block_num] = evicted_block
+                self._mru = block_num
             else:
                 # Cache not full, add new block
-                slot = cache_size
-                blocks[block_num] = Block(block_num, True, memoryview(self._cache[slot]))
-                blocks[block_num].content[:] = mvb[:]
+                b = self._slots[cache_size]
+                b.block_num = block_num
+                b.dirty = True
+                blocks[block_num] = b
+                b.content[:] = buf
+                self._dirty[block_num] = b
+                self._mru = block_num
 
                 # self.a.collect("cache/put/miss/not_full")  # fmt: skip
                 # self.a.log(f"->cache/put/miss/not_full @end {block_num}, slot {slot}, blocks {self._blocks}")  # fmt: skip
 
+    def put_partial(self, block_num: int, buf: memoryview, offset: int) -> bool:
+        """Patch len(buf) bytes at offset into a cached block in place and
+        mark it dirty, skipping the driver's read-modify-write round trip
+        through its temp buffer. Returns False on a miss (or in bypass
+        mode); the caller then falls back to the get/put RMW path."""
+        if self._cache_max_size == 0:
+            return False
+        block = self._blocks.get(block_num)
+        if block is None:
+            return False
+        block.content[offset : offset + len(buf)] = buf
+        block.dirty = True
+        self._dirty[block_num] = block
+        self._touch(block_num)
+        return True
+
+    def put_run(self, block_num: int, buf: memoryview, nblocks: int) -> None:
+        """Write nblocks contiguous full blocks from buf (nblocks * block_size
+        bytes). Short runs go block-by-block through put so they stay in the
+        write-back cache and can merge with neighbouring writes at sync time;
+        longer runs (or any run in bypass mode) stream to the device as a
+        single CMD25. Cached copies of streamed blocks are refreshed in place
+        and become clean - the device now holds exactly this data."""
+        if nblocks == 1:
+            self.put(block_num, buf)
+            return
+        if nblocks < 4 and self._cache_max_size != 0:
+            put = self.put
+            off = 0
+            for i in range(nblocks):
+                put(block_num + i, buf[off : off + _BLOCK_SIZE])
+                off += _BLOCK_SIZE
+            return
+        adhoc = [
+            Block(block_num + i, False, buf[i << _BLOCK_SHIFT : (i + 1) << _BLOCK_SHIFT])
+            for i in range(nblocks)
+        ]
+        self.write_to_device(adhoc)
+        blocks = self._blocks
+        dirty = self._dirty
+        off = 0
+        for i in range(nblocks):
+            bn = block_num + i
+            cached = blocks.get(bn)
+            if cached is not None:
+                cached.content[:] = buf[off : off + _BLOCK_SIZE]
+                if cached.dirty:
+                    cached.dirty = False
+                    dirty.pop(bn, None)
+            off += _BLOCK_SIZE
+
     def sync(self) -> None:
         """Write all dirty blocks to SD card.
         Finds dirty blocks, sort them, group them to use multiblock operations if possible.
@@ -311,42 +499,130 @@ class Cache:
         if self._cache_max_size == 0:
             return
 
-        blocks = self._blocks
-
-        dirty_blocks = sorted(
-            (block for block in blocks.values() if block.dirty), key=lambda x: x.block_num
-        )
-        # self.a.log(f"->cache/sync dirty blocks {dirty_blocks}")  # fmt: skip
+        # The dirty set is maintained incrementally on every put/eviction,
+        # so sync scans O(dirty) instead of every cached block.
+        dirty = self._dirty
+        # self.a.log(f"->cache/sync dirty blocks {dirty}")  # fmt: skip
         # self.a.collect(f"cache/sync/total")  # fmt: skip
-        if not dirty_blocks:
+        if not dirty:
             # self.a.collect(f"cache/sync/nodirtyblocks")  # fmt: skip
             return
 
-        block_groups = [[dirty_blocks[0]]]
-        dirty_blocks[0].dirty = False
-
-        # Group contiguous dirty blocks to use multiblock operations
-        for block in dirty_blocks[1:]:
+        # A single dirty block - the typical littlefs metadata commit -
+        # needs none of the sort/grouping machinery below
+        if len(dirty) == 1:
+            block = next(iter(dirty.values()))
+            self._write_one(block)
             block.dirty = False
-            if block.block_num == block_groups[-1][-1].block_num + 1:
-                block_groups[-1].append(block)
+            dirty.clear()
+            return
+
+        # The dirty map is keyed by block_num, so sorting the keys gives the
+        # write order with plain C int comparisons - no per-element key
+        # callback the way sorted(..., key=lambda ...) would need.
+        dirty_nums = sorted(dirty)
+
+        blocks = self._blocks
+        block_groups = [[dirty[dirty_nums[0]]]]
+        ebs = self.erase_block_sectors
+
+        # Group contiguous dirty blocks to use multiblock operations.
+        # A gap between runs is bridged when every missing block is cached
+        # (it must be clean, or it would be in the dirty set) and both ends
+        # lie in the same card erase block: rewriting unchanged data costs a
+        # frame per filler, but splitting the run there would cost a
+        # STOP_TRAN + CMD25 setup plus an internal erase-block RMW on the card.
+        for num in dirty_nums[1:]:
+            block = dirty[num]
+            group = block_groups[-1]
+            last = group[-1].block_num
+            if num == last + 1:
+                group.append(block)
+            elif num // ebs == last // ebs and all(
+                (last + i) in blocks for i in range(1, num - last)
+            ):
+                for i in range(1, num - last):
+                    group.append(blocks[last + i])
+                group.append(block)
             else:
                 block_groups.append([block])
 
+        # isolated dirty blocks skip the general writer and its hoisting
+        # overhead; real runs go through write_to_device's CMD25 path
+        write = self.write_to_device
+        write_one = self._write_one
         for group in block_groups:
-            self.write_to_device(group)
+            if len(group) == 1:
+                write_one(group[0])
+            else:
+                write(group)
+
+        # every run landed: only now retire the dirty state, so an I/O error
+        # mid-sync leaves all blocks marked dirty and the sync retryable
+        for num in dirty_nums:
+            dirty[num].dirty = False
+        dirty.clear()
 
         # self.a.log(f"->cache/sync dirty block groups {block_groups}, blocks {self._blocks}")  # fmt: skip
 
-    def read_from_device(self, blocks: list[Block]) -> None:
+    def _flush_dirty_run(self, block: Block) -> None:
+        """Write an evicted dirty victim to the device, together with any
+        cached dirty blocks contiguous with it: one CMD25 run instead of a
+        CMD24 now and more CMD24s when the neighbours get evicted later.
+        The neighbours stay cached, just clean. Run length is naturally
+        bounded by the cache size (the dirty set lives in the cache)."""
+        dirty = self._dirty
+        start = block.block_num
+        while (start - 1) in dirty:
+            start -= 1
+        num = start
+        run = []
+        while num in dirty:
+            run.append(dirty[num])
+            num += 1
+        if len(run) == 1:
+            self._write_one(block)
+        else:
+            self.write_to_device(run)
+        for b in run:
+            b.dirty = False
+            dirty.pop(b.block_num, None)
+
+    def _read_one(self, block: Block) -> None:
+        """Single-block variant of read_from_device: the dominant case, with
+        no one-element list built just to be destructured again."""
+        device = self._device
+        device._end_wstream()
+        if device.cmd(17, block.block_num * self._cdv, 0, release=False) != 0:
+            device.cs(1)
+            raise OSError(5)  # EIO
+        device.readinto(block.content)
+
+    def _write_one(self, block: Block) -> None:
+        """Single-block variant of write_to_device (see _read_one)."""
+        device = self._device
+        if device._spi_dirty_cs:
+            # see write_to_device for why this prelude exists
+            device.spi.write(b"\xff")
+            device._spi_dirty_cs = False
+        device._end_wstream()
+        if device.cmd(24, block.block_num * self._cdv, 0) != 0:
+            raise OSError(5)
+        device.write(_TOKEN_DATA, block.content)
+
+    def read_from_device(self, blocks: list[Block], contig: memoryview = None) -> None:
         """Read blocks fron the device to the cache blocks.
         Uses multiplock operations if possible.
         Read is made into the cache (blocks.content) unless a different buffer is provided.
+        When the blocks' buffers form one contiguous region, the caller can
+        pass it as contig and the whole CMD18 stream is clocked through the
+        device's batched frame reader instead of one readinto per block.
         This is the method that should be changed if the underlaying device changes."""
         cmd = self._device.cmd
         readinto = self._device.readinto
         cs = self._device.cs
-        cdv = self._device.cdv
+        cdv = self._cdv
+        self._device._end_wstream()
 
         if len(blocks) == 1:
             # Single block read
@@ -362,8 +638,11 @@ class Cache:
                 cs(1)
                 raise OSError(5)  # EIO
 
-            for block in blocks:
-                readinto(block.content)
+            if contig is not None:
+                self._device.readinto_blocks(contig, len(blocks))
+            else:
+                for block in blocks:
+                    readinto(block.content)
 
             if cmd(12, 0, 0xFF, skip1=True):
                 raise OSError(5)  # EIO
@@ -377,34 +656,69 @@ class Cache:
         cmd = self._device.cmd
         write = self._device.write
         spi = self._device.spi
-        cdv = self._device.cdv
-        write_token = self._device.write_token
+        cdv = self._cdv
 
         # workaround for shared bus, required for (at least) some Kingston
-        # devices, ensure MOSI is high before starting transaction
-        spi.write(b"\xff")
+        # devices, ensure MOSI is high before starting transaction. Only
+        # needed when another bus user may have driven MOSI since our last
+        # transfer, so it is skipped inside a burst of our own writes.
+        device = self._device
+        if device._spi_dirty_cs:
+            spi.write(b"\xff")
+            device._spi_dirty_cs = False
         if len(blocks) == 1:
+            device._end_wstream()
             if cmd(24, blocks[0].block_num * cdv, 0) != 0:
                 raise OSError(5)
             write(_TOKEN_DATA, blocks[0].content)
         else:
-            # Multiblock write
-            if cmd(25, blocks[0].block_num * cdv, 0) != 0:
-                raise OSError(5)
+            # Multiblock write. The CMD25 stream is left open after the last
+            # data frame (no STOP_TRAN here): when the next run starts exactly
+            # where this one ended - the sequential pattern of a large file
+            # write, which littlefs delivers as back-to-back writeblocks
+            # calls - the open stream is simply fed more frames, saving a
+            # STOP_TRAN, its busy wait and a fresh CMD25 per call. Every
+            # other card command is preceded by _end_wstream, and each frame
+            # is busy-waited individually, so the data is committed whether
+            # or not the stream ever continues.
+            if device._wstream_next != blocks[0].block_num:
+                device._end_wstream()
+                if device._use_pre_erase:
+                    # ACMD23: announce the run length so the card can
+                    # pre-erase the range instead of read-modify-erasing
+                    # block by block. Cards that don't support it answer
+                    # illegal-command, which is harmless to ignore. Only a
+                    # hint, so undershooting on a continued stream is fine.
+                    cmd(55, 0, 0)
+                    cmd(23, len(blocks), 0)
+                if cmd(25, blocks[0].block_num * cdv, 0) != 0:
+                    raise OSError(5)
             for block in blocks:
                 write(_TOKEN_DATA, block.content)
-
-            write_token(_TOKEN_STOP_TRAN)
+            device._wstream_next = blocks[0].block_num + len(blocks)
 
     def reset_cache(self, cache_max_size: int, policy: str = "LRU", read_ahead: int = 1) -> None:
         """Reset the cache. This is mainly for testing purposes, to change
         the cache size on the fly during test runs."""
         self._cache_max_size = cache_max_size
         self._eviction_policy = policy.upper()
+        self._select_evictor()
         self._read_ahead = read_ahead
 
-        self._cache: list[bytearray] = [bytearray(self._block_size) for _ in range(cache_max_size)]
-        self._blocks: LRMDict = LRMDict()
+        block_size = self._block_size
+        if len(self._pool) != block_size * cache_max_size:
+            # reuse the existing pool allocation when the size is unchanged
+            self._pool = bytearray(block_size * cache_max_size)
+            self._mv_pool = memoryview(self._pool)
+            self._cache: list[memoryview] = [
+                self._mv_pool[i * block_size : (i + 1) * block_size]
+                for i in range(cache_max_size)
+            ]
+            self._slots = [Block(-1 - i, False, self._cache[i], i) for i in range(cache_max_size)]
+        self._blocks: OrderedDict = OrderedDict()
+        self._dirty = {}
+        self._mru = -1
+        self._last_miss_block = -1
 
     def show_cache_status(self):
         """Print the cache status."""
@@ -436,15 +750,39 @@ class SDCard:
         self.cs = cs
 
         self.cmdbuf = bytearray(6)
-        self.dummybuf = bytearray(512)
+        self.dummybuf = bytearray(b"\xff" * 512)
         self.tokenbuf = bytearray(1)
-        for i in range(512):
-            self.dummybuf[i] = 0xFF
         self.dummybuf_memoryview = memoryview(self.dummybuf)
 
-        # Temporary buffer for partial block handling
-        self._tempbuf = bytearray(512)
+        # Temporary buffer for partial block handling. Backed by a typed
+        # array ('B') rather than a bytearray: same byte layout, but it can
+        # never be resized by accident, so the memoryview below stays valid
+        # for the lifetime of the driver.
+        self._tempbuf = array("B", b"\x00" * 512)
         self._mvt = memoryview(self._tempbuf)
+        # stream read buffers: one 515-byte transfer covers token + data + CRC
+        # of a block inside a CMD18 stream
+        self._streamsrc = bytes(b"\xff" * 515)
+        self._streambuf = bytearray(515)
+        self._mv_streambuf = memoryview(self._streambuf)
+        # write staging: token + 512 data + 2 CRC clocked as one transaction
+        # (the CRC placeholder bytes stay 0xFF)
+        self._writebuf = bytearray(b"\xff" * 515)
+        # shared all-0xFF source: busy-wait poll clocking (16-byte batches),
+        # response-tail discards in cmd, init dummy clocks
+        self._ff16 = bytes(b"\xff" * 16)
+        self.pollbuf = bytearray(16)
+        # True whenever a foreign bus user may have driven MOSI since our
+        # last transfer; re-armed on every public entry point so the first
+        # write of each call emits the MOSI-high prelude (see write_to_device)
+        self._spi_dirty_cs = True
+        # announce multiblock run lengths with ACMD23 so the card can
+        # pre-erase the range; benefit is card-dependent, clear this to
+        # skip the extra command pair per CMD25
+        self._use_pre_erase = True
+        # block number the open CMD25 write stream expects next, or -1 when
+        # no stream is open (see Cache.write_to_device)
+        self._wstream_next = -1
         self._cache = Cache(
             self, block_size, cache_max_size, eviction_policy, read_ahead, **debug_flags
         )
@@ -472,6 +810,12 @@ class SDCard:
 
         # initialise the card
         self.init_card(baudrate)
+        # now that the card reported its geometry, let the cache clip
+        # read-ahead at the device boundary
+        self._cache._sectors = self.sectors
+        self._cache._cdv = self.cdv
+        # constant-answer ioctl ops resolved by one dict lookup
+        self._ioctl_const = {4: self.sectors, 5: 512}
 
     def init_spi(self, baudrate):
         try:
@@ -490,9 +834,9 @@ class SDCard:
         # init SPI bus; use low data rate for initialisation
         self.init_spi(100000)
 
-        # clock card at least 100 cycles with cs high
-        for i in range(16):
-            self.spi.write(b"\xff")
+        # clock card at least 100 cycles with cs high; one 16-byte transfer
+        # is the same 128 clocks as 16 single-byte writes
+        self.spi.write(self._ff16)
 
         # CMD0: init card; should return _R1_IDLE_STATE (allow 5 attempts)
         for _ in range(5):
@@ -564,6 +908,7 @@ class SDCard:
                 return
         raise OSError("timeout waiting for v2 card")
 
+    @micropython.native
     def cmd(self, cmd, arg, crc, final=0, release=True, skip1=False):
         self.cs(0)
 
@@ -590,8 +935,10 @@ class SDCard:
                 if final < 0:
                     self.spi.readinto(self.tokenbuf, 0xFF)
                     final = -1 - final
-                for j in range(final):
-                    self.spi.write(b"\xff")
+                if final > 0:
+                    # discard the rest of the response in one transfer
+                    # instead of one driver call per byte
+                    self.spi.write(self._ff16[:final])
                 if release:
                     self.cs(1)
                     self.spi.write(b"\xff")
@@ -602,6 +949,7 @@ class SDCard:
         self.spi.write(b"\xff")
         return -1
 
+    @micropython.native
     def readinto(self, buf):
         self.cs(0)
 
@@ -622,19 +970,58 @@ class SDCard:
         self.spi.write_readinto(mv, buf)
 
         # read checksum
-        self.spi.write(b"\xff")
-        self.spi.write(b"\xff")
+        self.spi.write(b"\xff\xff")
         self.cs(1)
         self.spi.write(b"\xff")
 
+    @micropython.native
+    def readinto_blocks(self, buf, nblocks):
+        """Read nblocks full blocks of an open CMD18 stream into the
+        contiguous buffer buf (nblocks * 512 bytes). Each block is fetched as
+        a single 515-byte transfer (token + data + CRC) instead of a token
+        poll, a data transfer and a CRC discard per block. The card may insert
+        idle bytes before a token, shifting it inside the window, so the
+        copy-out adjusts to wherever the token actually landed."""
+        self.cs(0)
+        streambuf = self._streambuf
+        mvs = self._mv_streambuf
+        dummy = self.dummybuf_memoryview
+        pos = 0
+        for _ in range(nblocks):
+            end = pos + 512
+            self.spi.write_readinto(self._streamsrc, streambuf)
+            if streambuf[0] == _TOKEN_DATA:
+                # common case: token first, data and CRC fully clocked
+                buf[pos:end] = mvs[1:513]
+            else:
+                idx = streambuf.find(b"\xfe")
+                if idx < 0:
+                    # token not seen in this window, wait for it normally
+                    self.readinto(buf[pos:end])
+                else:
+                    have = 514 - idx  # bytes clocked in behind the token
+                    if have >= 512:
+                        buf[pos:end] = mvs[idx + 1 : idx + 513]
+                        # clock out whatever part of the CRC is still due
+                        if have < 514:
+                            self.spi.write(dummy[: 514 - have])
+                    else:
+                        buf[pos : pos + have] = mvs[idx + 1 :]
+                        self.spi.write_readinto(dummy[: 512 - have], buf[pos + have : end])
+                        self.spi.write(b"\xff\xff")
+            pos = end
+
+    @micropython.native
     def write(self, token, buf):
         self.cs(0)
 
-        # send: start of block, data, checksum
-        self.spi.read(1, token)
-        self.spi.write(buf)
-        self.spi.write(b"\xff")
-        self.spi.write(b"\xff")
+        # send start of block, data and checksum as one transaction; the
+        # 512-byte copy into the staging buffer is cheaper than the extra
+        # per-transfer SPI setup of three separate writes
+        wbuf = self._writebuf
+        wbuf[0] = token
+        wbuf[1:513] = buf
+        self.spi.write(wbuf)
 
         # check the response
         if (self.spi.read(1, 0xFF)[0] & 0x1F) != 0x05:
@@ -642,13 +1029,27 @@ class SDCard:
             self.spi.write(b"\xff")
             return
 
-        # wait for write to finish
-        while self.spi.read(1, 0xFF)[0] == 0:
-            pass
+        # wait for write to finish, polling 16 bytes per SPI transaction.
+        # The card holds DO low while busy, so once the last byte of a batch
+        # is non-zero the card is ready; overshooting a few clocks is harmless.
+        poll = self.pollbuf
+        src = self._ff16
+        while True:
+            self.spi.write_readinto(src, poll)
+            if poll[-1] != 0:
+                break
 
         self.cs(1)
         self.spi.write(b"\xff")
 
+    def _end_wstream(self):
+        """Send the STOP_TRAN that a streamed write left pending (see
+        Cache.write_to_device). The card stays in receive-data state until
+        this token, so it must run before any other card command."""
+        if self._wstream_next >= 0:
+            self._wstream_next = -1
+            self.write_token(_TOKEN_STOP_TRAN)
+
     def write_token(self, token):
         self.cs(0)
         self.spi.read(1, token)
@@ -660,170 +1061,179 @@ class SDCard:
         self.cs(1)
         self.spi.write(b"\xff")
 
+    @micropython.native
     def readblocks(self, block_num, buf, offset=0):
+        self._spi_dirty_cs = True
 
         if offset < 0:
             raise ValueError("readblocks: Offset must be non-negative")
 
         # Adjust the block number based on the offset
         len_buf = len(buf)
-        block_num += offset // 512
-        offset %= 512
-        nblocks = (offset + len(buf) + 511) // 512
-        mvb = memoryview(buf)
+        block_num += offset >> _BLOCK_SHIFT
+        offset &= _BLOCK_MASK
+        nblocks = (offset + len_buf + 511) >> _BLOCK_SHIFT
         mvt = self._mvt
 
-        # DEBUG
-        # if self._cache._debug_flags.get("analytics", False):
-        #     # Stats collection
-        #     aligned = offset == 0 and (offset + len_buf) % 512 == 0
-        #     miss_left = offset > 0 and (offset + len_buf) % 512 == 0
-        #     miss_right = offset == 0 and (offset + len_buf) % 512 > 0
-        #     miss_both = offset > 0 and (offset + len_buf) % 512 > 0
-        #     # self.a.log(f"->sdcard/rb: {block_num}, offset {offset}, nblocks {nblocks}, len_buf {len_buf}")  # fmt: skip
-        #     # self.a.collect("sdcard/rb")
-        #     if nblocks == 1:
-        #         pass
-        #         # self.a.collect("sdcard/rb/single")
-        #         # self.a.collect("sdcard/rb/single/min", len_buf, mode="min")
-        #         # self.a.collect("sdcard/rb/single/max", len_buf, mode="max")
-        #         # self.a.collect("sdcard/rb/single/avg", len_buf, mode="avg")
-        #         # self.a.collect("sdcard/rb/single/aligned") if aligned else None
-        #         # self.a.collect("sdcard/rb/single/miss_left") if miss_left else None
-        #         # self.a.collect("sdcard/rb/single/miss_right") if miss_right else None
-        #         # self.a.collect("sdcard/rb/single/miss_both") if miss_both else None
-        #     else:
-        #         pass
-        #         # self.a.collect("sdcard/rb/multi")
-        #         # self.a.collect("sdcard/rb/multi/min", len_buf, mode="min")
-        #         # self.a.collect("sdcard/rb/multi/max", len_buf, mode="max")
-        #         # self.a.collect("sdcard/rb/multi/avg", len_buf, mode="avg")
-        #         # self.a.collect("sdcard/rb/multi/aligned") if aligned else None
-        #         # self.a.collect("sdcard/rb/multi/miss_left") if miss_left else None
-        #         # self.a.collect("sdcard/rb/multi/miss_right") if miss_right else None
-        #         # self.a.collect("sdcard/rb/multi/miss_both") if miss_both else None
+        if _PROFILE:
+            kind = "single" if nblocks == 1 else "multi"
+            self.a.collect(f"sdcard/rb/{kind}")
+            self.a.collect(f"sdcard/rb/{kind}/avg", len_buf, mode="avg")
+            self.a.collect(f"sdcard/rb/{kind}/miss_left") if offset > 0 else None
+            self.a.collect(f"sdcard/rb/{kind}/miss_right") if (offset + len_buf) & _BLOCK_MASK else None
 
         if nblocks == 1:
-            # Only one block to read (partial or complete)
-            self._cache.get(block_num, mvt)
-            mvb[:] = mvt[offset : offset + len_buf]
+            # Only one block to read (partial or complete). Works on the
+            # caller's buffer directly - no memoryview is needed (or built)
+            # for this, the dominant littlefs call shape.
+            if offset == 0 and len_buf == 512:
+                # whole-block read: fill the caller's buffer in one go,
+                # no bounce through the temp buffer
+                self._cache.get(block_num, buf)
+            else:
+                self._cache.get(block_num, mvt)
+                buf[:] = mvt[offset : offset + len_buf]
+            return
 
-        else:
-            # More than one block to read
-            # CMD18: set read address for multiple blocks
+        mvb = memoryview(buf)
 
-            bytes_read = 0
+        if offset == 0 and len_buf & _BLOCK_MASK == 0 and nblocks >= 4:
+            # Aligned streaming read: one CMD18 straight into the caller's
+            # buffer instead of nblocks cache get() calls. Only safe when no
+            # block of the range is cached (a cached copy may be dirty), and
+            # deliberately does not populate the cache, so a long sequential
+            # read can't wipe out the working set.
+            cache = self._cache
+            if not any((block_num + i) in cache._blocks for i in range(nblocks)):
+                adhoc = [
+                    Block(block_num + i, False, mvb[i * 512 : (i + 1) * 512])
+                    for i in range(nblocks)
+                ]
+                cache.read_from_device(adhoc, mvb)
+                return
 
-            # Handle the initial partial block write if there's an offset
-            if offset > 0:
-                self._cache.get(block_num, mvt)
-                bytes_from_first_block = 512 - offset
-                mvb[0:bytes_from_first_block] = mvt[offset:]
-                bytes_read += bytes_from_first_block
-                block_num += 1
+        get = self._cache.get
 
-            # Read full blocks if any
-            while bytes_read + 512 <= len_buf:
-                self._cache.get(block_num, mvb[bytes_read : bytes_read + 512])
-                bytes_read += 512
-                block_num += 1
+        # More than one block to read
+        bytes_read = 0
 
-            # Handle the las partial block if needed
-            if bytes_read < len_buf:
-                self._cache.get(block_num, mvt)
-                mvb[bytes_read:] = mvt[: len_buf - bytes_read]
+        # Handle the initial partial block write if there's an offset
+        if offset > 0:
+            get(block_num, mvt)
+            bytes_from_first_block = 512 - offset
+            mvb[0:bytes_from_first_block] = mvt[offset:]
+            bytes_read += bytes_from_first_block
+            block_num += 1
+
+        # Read full blocks if any
+        while bytes_read + 512 <= len_buf:
+            get(block_num, mvb[bytes_read : bytes_read + 512])
+            bytes_read += 512
+            block_num += 1
 
+        # Handle the las partial block if needed
+        if bytes_read < len_buf:
+            get(block_num, mvt)
+            mvb[bytes_read:] = mvt[: len_buf - bytes_read]
+
+    @micropython.native
     def writeblocks(self, block_num, buf, offset=0):
+        self._spi_dirty_cs = True
 
         if offset < 0:
             raise ValueError("writeblocks: Offset must be non-negative")
 
         # Adjust for offset bigger than block size. Is this a thing?
         len_buf = len(buf)
-        block_num += offset // 512
-        offset %= 512
-        nblocks = (offset + len_buf + 511) // 512
-
-        # Determine if the first and last blocks are misaligned
-        first_misaligned = offset > 0
-        last_misaligned = (offset + len_buf) % 512 > 0
-
-        # DEBUG
-        # if self._cache._debug_flags.get("analytics", False):
-        #     # Stats collection
-        #     aligned = offset == 0 and (offset + len_buf) % 512 == 0
-        #     miss_left = offset > 0 and (offset + len_buf) % 512 == 0
-        #     miss_right = offset == 0 and (offset + len_buf) % 512 > 0
-        #     miss_both = offset > 0 and (offset + len_buf) % 512 > 0
-        #     # self.a.log(f"->sdcard/wb: {block_num}, offset {offset}, nblocks {nblocks}, len_buf {len_buf}")  # fmt: skip
-        #     # self.a.collect("sdcard/wb")
-        #     if nblocks == 1:
-        #         pass
-        #         # self.a.collect("sdcard/wb/single")
-        #         # self.a.collect("sdcard/wb/single/min", len_buf, mode="min")
-        #         # self.a.collect("sdcard/wb/single/max", len_buf, mode="max")
-        #         # self.a.collect("sdcard/wb/single/avg", len_buf, mode="avg")
-        #         # self.a.collect("sdcard/wb/single/aligned") if aligned else None
-        #         # self.a.collect("sdcard/wb/single/miss_left") if miss_left else None
-        #         # self.a.collect("sdcard/wb/single/miss_right") if miss_right else None
-        #         # self.a.collect("sdcard/wb/single/miss_both") if miss_both else None
-        #     else:
-        #         pass
-        #         # self.a.collect("sdcard/wb/multi")
-        #         # self.a.collect("sdcard/wb/multi/min", len_buf, mode="min")
-        #         # self.a.collect("sdcard/wb/multi/max", len_buf, mode="max")
-        #         # self.a.collect("sdcard/wb/multi/avg", len_buf, mode="avg")
-        #         # self.a.collect("sdcard/wb/multi/aligned") if aligned else None
-        #         # self.a.collect("sdcard/wb/multi/miss_left") if miss_left else None
-        #         # self.a.collect("sdcard/wb/multi/miss_right") if miss_right else None
-        #         # self.a.collect("sdcard/wb/multi/miss_both") if miss_both else None
+        block_num += offset >> _BLOCK_SHIFT
+        offset &= _BLOCK_MASK
+        end = offset + len_buf
+        nblocks = (end + 511) >> _BLOCK_SHIFT
+
+        if offset == 0 and len_buf & _BLOCK_MASK == 0:
+            # Fully aligned write - LittleFS's common case. Hand the whole
+            # run to the cache without any of the misalignment bookkeeping
+            # below; put_run picks per-block caching or CMD25 streaming.
+            # (put_run slices its buffer per block, so it needs a view:
+            # slicing a bytearray would copy.)
+            if nblocks == 1:
+                # single whole block: straight into put, no view, no
+                # run dispatch
+                self._cache.put(block_num, buf)
+            else:
+                self._cache.put_run(block_num, memoryview(buf), nblocks)
+            return
+
+        if _PROFILE:
+            kind = "single" if nblocks == 1 else "multi"
+            self.a.collect(f"sdcard/wb/{kind}")
+            self.a.collect(f"sdcard/wb/{kind}/avg", len_buf, mode="avg")
+            self.a.collect(f"sdcard/wb/{kind}/miss_left") if offset > 0 else None
+            self.a.collect(f"sdcard/wb/{kind}/miss_right") if end & _BLOCK_MASK else None
 
         mvt = self._mvt
-        mvb = memoryview(buf)
+        get = self._cache.get
+        put = self._cache.put
+
+        put_partial = self._cache.put_partial
 
         if nblocks == 1:
-            if offset == 0 and (offset + len_buf) == 512:
-                # Single complete block, no need to read
-                self._cache.put(block_num, mvb)
-            else:
-                # Single partial block, need to read first
-                self._cache.get(block_num, mvt)
-                mvt[offset : offset + len_buf] = mvb[:]
-                self._cache.put(block_num, mvt)
+            # Single partial block (aligned writes took the fast path).
+            # A cache hit is patched in place; a miss needs the read first.
+            # Uses the caller's buffer directly, no memoryview built.
+            if not put_partial(block_num, buf, offset):
+                get(block_num, mvt)
+                mvt[offset:end] = buf
+                put(block_num, mvt)
         else:
+            mvb = memoryview(buf)
+            # (-offset) & 511 is 0 for an aligned head, else 512 - offset:
+            # one mask instead of a compare-and-subtract. A non-zero head is
+            # always partial here - a full-block head would have taken the
+            # aligned fast path and needs no pre-read at all.
+            head_len = (-offset) & _BLOCK_MASK
             bytes_written = 0
-            # Handle the initial partial block write if there's an offset
-            if first_misaligned > 0:
-                self._cache.get(block_num, mvt)
-                bytes_for_first_block = 512 - offset
-                mvt[offset:] = mvb[0:bytes_for_first_block]
-                self._cache.put(block_num, mvt)
-                bytes_written += bytes_for_first_block
+            if head_len:
+                head = mvb[0:head_len]
+                if not put_partial(block_num, head, offset):
+                    get(block_num, mvt)
+                    mvt[offset:] = head
+                    put(block_num, mvt)
+                bytes_written = head_len
                 block_num += 1
 
-            # Write full blocks if any
-            while bytes_written + 512 <= len_buf:
-                self._cache.put(block_num, mvb[bytes_written : bytes_written + 512])
-                bytes_written += 512
-                block_num += 1
+            # Write full blocks if any, as one contiguous run
+            full = (len_buf - bytes_written) >> _BLOCK_SHIFT
+            if full > 0:
+                run_len = full << _BLOCK_SHIFT
+                self._cache.put_run(block_num, mvb[bytes_written : bytes_written + run_len], full)
+                bytes_written += run_len
+                block_num += full
 
             # Handle the last partial block if needed
-            if bytes_written < len_buf:
-                self._cache.get(block_num, mvt)
-                mvt[0 : len_buf - bytes_written] = mvb[bytes_written:]
-                self._cache.put(block_num, mvt)
+            tail_len = len_buf - bytes_written
+            if tail_len > 0:
+                tail = mvb[bytes_written:]
+                if not put_partial(block_num, tail, 0):
+                    get(block_num, mvt)
+                    mvt[0:tail_len] = tail
+                    put(block_num, mvt)
 
     def ioctl(self, op, arg):
+        # ops with precomputed answers (4: number of blocks, 5: block size)
+        # dispatch through one dict probe instead of the comparison chain
+        val = self._ioctl_const.get(op)
+        if val is not None:
+            return val
+        self._spi_dirty_cs = True
         if op == 3:  # sync
             # self.a.log(f"->sdcard: ioctl(3) sync")
             # self.a.collect("sdcard/sync/fs")
             self._cache.sync()
+            # the sync runs may have continued an open write stream;
+            # after a sync the card must be fully idle
+            self._end_wstream()
             return 0
-        if op == 4:  # get number of blocks
-            # return 16 * 1024 * 1024 / 512  # Spoofing the number of blocks for testing purposes
-            return self.sectors
-        if op == 5:  # get block size in bytes
-            return 512
         if op == 6:  # Erase block, handled by the controller
             # LFS expects the erased block to be really erased (xff) or it complains about data corruption.
             # This doesn't make a lot of sense in the context of SD cards, but no other option for now.
@@ -832,10 +1242,11 @@ class SDCard:
                 if block.dirty:
                     raise OSError(f"SDCard: ioctl(6,{arg}) - Can't erase a dirty block")
                 else:
-                    block.content[:] = b"\xff" * 512
+                    block.content[:] = _ERASE_MV
                     block.dirty = True
+                    self._cache._dirty[arg] = block
             else:
-                self._cache.put(arg, b"\xff" * 512)  # type: ignore
+                self._cache.put(arg, _ERASE_MV)
             # self.a.log(f"->sdcard: eraseblock {arg}: {self._cache._blocks}")
             # self.a.collect("sdcard/eraseblock")
             return 0